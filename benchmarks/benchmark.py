@@ -0,0 +1,284 @@
+"""
+Benchmarks for the integration running against a simulated gateway.
+
+Every scenario sets up a config entry with the "simulator" protocol in a throwaway Home Assistant instance,
+which brings up the coordinator along with the climate, binary_sensor and button platforms, then measures:
+
+* poll duration (percentiles over repeated coordinator refreshes)
+* commands sent to the gateway per poll, and climate commands completed per second
+* entity state writes per poll
+* peak memory allocated during the scenario
+
+Usage (from the repository root, with Home Assistant and the integration's requirements installed):
+
+    python benchmarks/benchmark.py                  # run and compare against benchmarks/baseline.json
+    python benchmarks/benchmark.py --save-baseline  # run and store the results as the new baseline
+
+Exits with status 1 if any metric regressed by more than --tolerance compared to the baseline,
+or with status 2 if there is no baseline to compare against.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+
+DOMAIN = "coolmaster_ng"
+
+# (units, simulated latency in seconds, simulated baud rate or 0 for unthrottled)
+SCENARIOS = [
+    (10, 0.0, 0),
+    (50, 0.0, 0),
+    (100, 0.0, 0),
+    (50, 0.02, 0),
+    (50, 0.0, 9600),
+]
+
+# for each metric, whether a higher value is better
+METRICS = {
+    "poll_p50": False,
+    "poll_p95": False,
+    "poll_max": False,
+    "gateway_commands_per_poll": False,
+    "state_writes_per_poll": False,
+    "commands_per_second": True,
+    "peak_memory_kib": False,
+}
+
+# seconds poll durations may differ by regardless of the tolerance, polls of an unthrottled simulator
+# only take a few milliseconds so scheduling jitter alone makes up a large relative change
+POLL_NOISE_FLOOR = 0.02
+
+
+def _percentile(values: list[float], percentile: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(percentile / 100 * (len(values) - 1))))]
+
+
+async def _async_create_hass(config_dir: str):
+    from homeassistant import config_entries, core
+    from homeassistant.helpers import device_registry, entity_registry
+
+    try:
+        hass = core.HomeAssistant(config_dir)
+    except TypeError:
+        # older releases take no arguments
+        hass = core.HomeAssistant()
+
+    hass.config.config_dir = config_dir
+    hass.config.skip_pip = True
+    # the network integration depends on these, which need a full-blown instance - nothing here uses them
+    hass.config.components.update({"http", "websocket_api"})
+
+    await device_registry.async_load(hass)
+    await entity_registry.async_load(hass)
+
+    hass.config_entries = config_entries.ConfigEntries(hass, {})
+    await hass.config_entries.async_initialize()
+
+    return hass
+
+
+async def async_run_scenario(units: int, latency: float, baudrate: int, polls: int, commands: int) -> dict:
+    from homeassistant.config_entries import ConfigEntry
+    from homeassistant.const import ATTR_ENTITY_ID, ATTR_TEMPERATURE, CONF_PROTOCOL
+    from homeassistant.helpers.entity import Entity
+
+    from custom_components.coolmaster_ng.const import (
+        CONF_SERIAL_BAUD,
+        CONF_SIMULATOR_LATENCY,
+        CONF_SIMULATOR_UNITS,
+        DATA_COORDINATOR,
+        PROTOCOL_SIMULATOR,
+    )
+
+    state_writes = 0
+    original_write_ha_state = Entity.async_write_ha_state
+
+    def counting_write_ha_state(self):
+        nonlocal state_writes
+        state_writes += 1
+        return original_write_ha_state(self)
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        os.symlink(REPO_ROOT / "custom_components", Path(config_dir) / "custom_components")
+
+        tracemalloc.start()
+        Entity.async_write_ha_state = counting_write_ha_state
+
+        hass = await _async_create_hass(config_dir)
+
+        try:
+            entry = ConfigEntry(
+                version=2,
+                domain=DOMAIN,
+                title=f"Benchmark with {units} units",
+                data={
+                    CONF_PROTOCOL: PROTOCOL_SIMULATOR,
+                    CONF_SIMULATOR_UNITS: units,
+                    CONF_SIMULATOR_LATENCY: latency,
+                    CONF_SERIAL_BAUD: baudrate,
+                },
+                source="user",
+            )
+            await hass.config_entries.async_add(entry)
+            await hass.async_block_till_done()
+
+            coordinator = hass.data[DOMAIN][entry.entry_id][DATA_COORDINATOR]
+            transport = coordinator.gateway.transport
+
+            gateway_commands = 0
+            original_command = transport.command
+
+            async def counting_command(command: str):
+                nonlocal gateway_commands
+                gateway_commands += 1
+                return await original_command(command)
+
+            transport.command = counting_command
+
+            # polls
+            state_writes = 0
+            durations = []
+
+            for _ in range(polls):
+                started = time.perf_counter()
+                await coordinator.async_refresh()
+                durations.append(time.perf_counter() - started)
+
+                # have the simulated units change a little between polls, like a real building would
+                for unit in list(transport.gateway.units.values())[::10]:
+                    unit.current_temperature += 1
+
+            await hass.async_block_till_done()
+
+            poll_writes = state_writes
+            poll_commands = gateway_commands
+
+            # commands, spread over all units as an automation would
+            climate_entities = sorted(hass.states.async_entity_ids("climate"))
+            started = time.perf_counter()
+
+            await asyncio.gather(
+                *(
+                    hass.services.async_call(
+                        "climate",
+                        "set_temperature",
+                        {
+                            ATTR_ENTITY_ID: climate_entities[index % len(climate_entities)],
+                            ATTR_TEMPERATURE: 20 + index % 5,
+                        },
+                        blocking=True,
+                    )
+                    for index in range(commands)
+                )
+            )
+
+            commands_duration = time.perf_counter() - started
+
+            await hass.config_entries.async_unload(entry.entry_id)
+            await hass.async_block_till_done()
+        finally:
+            Entity.async_write_ha_state = original_write_ha_state
+            _, peak_memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            await hass.async_stop(force=True)
+
+    return {
+        "poll_p50": statistics.median(durations),
+        "poll_p95": _percentile(durations, 95),
+        "poll_max": max(durations),
+        "gateway_commands_per_poll": poll_commands / polls,
+        "state_writes_per_poll": poll_writes / polls,
+        "commands_per_second": commands / commands_duration,
+        "peak_memory_kib": peak_memory / 1024,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Return a description of every metric which got worse than the baseline by more than the tolerance.
+    """
+    regressions = []
+
+    for scenario, metrics in results.items():
+        if scenario not in baseline:
+            continue
+
+        for metric, value in metrics.items():
+            reference = baseline[scenario].get(metric)
+
+            if not reference:
+                continue
+
+            if metric.startswith("poll_") and abs(value - reference) < POLL_NOISE_FLOOR:
+                continue
+
+            change = (value - reference) / reference
+
+            if METRICS[metric]:
+                change = -change
+
+            if change > tolerance:
+                regressions.append(f"{scenario} {metric}: {reference:.4g} -> {value:.4g} ({change:+.0%} worse)")
+
+    return regressions
+
+
+async def async_main(args: argparse.Namespace) -> int:
+    results = {}
+
+    for units, latency, baudrate in SCENARIOS:
+        scenario = f"units={units} latency={latency} baudrate={baudrate or 'unthrottled'}"
+        results[scenario] = await async_run_scenario(units, latency, baudrate, args.polls, args.commands)
+
+        print(scenario)
+
+        for metric, value in results[scenario].items():
+            print(f"    {metric:<28}{value:>12.4f}")
+
+    if args.save_baseline:
+        BASELINE_PATH.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Baseline saved to {BASELINE_PATH}")
+        return 0
+
+    if not BASELINE_PATH.exists():
+        print(f"No baseline to compare against at {BASELINE_PATH}, run with --save-baseline to create one")
+        return 2
+
+    if regressions := compare(results, json.loads(BASELINE_PATH.read_text()), args.tolerance):
+        print("Regressions compared to the baseline:")
+        print("\n".join(f"    {regression}" for regression in regressions))
+        return 1
+
+    print("No regressions compared to the baseline")
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--polls", type=int, default=20, help="coordinator refreshes per scenario")
+    parser.add_argument("--commands", type=int, default=50, help="climate commands per scenario")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative regression to tolerate")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    sys.path.insert(0, str(REPO_ROOT))
+
+    sys.exit(asyncio.run(async_main(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,56 +1,149 @@
 """The Coolmaster integration."""
+from __future__ import annotations
+
+import asyncio
 import logging
+import time
+from collections.abc import Awaitable
+from datetime import timedelta
+from functools import partial
+from typing import Any
 
 from homeassistant.components.climate import SCAN_INTERVAL
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_HOST, CONF_PORT, CONF_PROTOCOL, Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.const import CONF_HOST, CONF_PORT, CONF_PROTOCOL, EVENT_HOMEASSISTANT_STOP, Platform
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.exceptions import ConfigEntryNotReady
 from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import event
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.dispatcher import async_dispatcher_send
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
-from pycoolmasternet_ng import exceptions, models, transports
+from homeassistant.util.dt import utcnow
+from pycoolmasternet_ng import constants, exceptions, models, transports
+from pycoolmasternet_ng.structures import UID
 
-from .const import CONF_SERIAL_BAUD, CONF_SERIAL_URL, DATA_COORDINATOR, DOMAIN, PROTOCOL_SERIAL, PROTOCOL_SOCKET
+from .ambient import AmbientTemperatureFeeder
+from .commands import CommandQueue
+from .connection import HTTPTransport, PersistentTCPTransport, unwrap_transport
+from .const import (
+    CONF_AMBIENT_DEADBAND,
+    CONF_AMBIENT_MIN_INTERVAL,
+    CONF_AMBIENT_SENSORS,
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_RECORD_TRAFFIC,
+    CONF_RECORDING_PATH,
+    CONF_REPLAY_REALTIME,
+    CONF_SERIAL_BAUD,
+    CONF_SERIAL_NUMBER,
+    CONF_SERIAL_URL,
+    CONF_SIMULATOR_ERROR_RATE,
+    CONF_SIMULATOR_LATENCY,
+    CONF_SIMULATOR_UNITS,
+    CONF_STREAMING,
+    DATA_COORDINATOR,
+    DATA_SCHEDULER,
+    DEFAULT_AMBIENT_DEADBAND,
+    DEFAULT_AMBIENT_MIN_INTERVAL,
+    DEFAULT_MAX_SCAN_INTERVAL,
+    DEFAULT_REST_PORT,
+    DEVICE_REFRESH_COOLDOWN,
+    DOMAIN,
+    FAST_SCAN_INTERVAL,
+    FAST_SCAN_WINDOW,
+    GATEWAY_CACHE_SAVE_DELAY,
+    GATEWAY_RECONCILE_RETRY_INTERVAL,
+    PROTOCOL_REPLAY,
+    PROTOCOL_REST,
+    PROTOCOL_SERIAL,
+    PROTOCOL_SIMULATOR,
+    PROTOCOL_SOCKET,
+    RUNTIME_MAX_GAP,
+    SIGNAL_UNITS_ADDED,
+    STATIC_REFRESH_INTERVAL,
+    UNIT_REMOVAL_LISTINGS,
+    UNIT_RETRY_INTERVAL,
+    UNIT_RETRY_MAX_INTERVAL,
+)
+from .discovery import gateway_model_from_serial_number
+from .priority import PRIORITY_INTERACTIVE, PriorityTransport, command_priority
+from .recording import RecordingTransport, ReplayTransport
+from .runtime import RuntimeTracker
+from .scheduler import PollScheduler
+from .simulator import SimulatedGateway, SimulatorConditions, SimulatorTransport
+from .storage import GatewayStore, deserialize_gateway, serialize_gateway
+from .stream import StatusStream
+from .supervisor import CircuitBreakerTransport
+from .telemetry import PollTelemetry, TelemetryTransport
 
 _LOGGER = logging.getLogger(__name__)
 
-PLATFORMS = [Platform.CLIMATE, Platform.BINARY_SENSOR, Platform.BUTTON]
+PLATFORMS = [Platform.CLIMATE, Platform.BINARY_SENSOR, Platform.BUTTON, Platform.SENSOR]
 
 
-def _get_transport_from_config_data(data: dict) -> transports.BaseTransport:
+def _get_transport_from_config_data(hass: HomeAssistant, data: dict) -> transports.BaseTransport:
     protocol = data.get(CONF_PROTOCOL, PROTOCOL_SOCKET)
 
     if protocol == PROTOCOL_SOCKET:
-        return transports.TCPTransport(data[CONF_HOST], port=data.get(CONF_PORT))
+        return PersistentTCPTransport(data[CONF_HOST], port=data.get(CONF_PORT))
+
+    if protocol == PROTOCOL_REST:
+        return HTTPTransport(
+            async_get_clientsession(hass),
+            data[CONF_HOST],
+            data.get(CONF_PORT, DEFAULT_REST_PORT),
+            data[CONF_SERIAL_NUMBER],
+        )
 
     if protocol == PROTOCOL_SERIAL:
         return transports.SerialTransport(data[CONF_SERIAL_URL], baudrate=data.get(CONF_SERIAL_BAUD))
 
+    if protocol == PROTOCOL_SIMULATOR:
+        units = data[CONF_SIMULATOR_UNITS]
+
+        return SimulatorTransport(
+            SimulatedGateway(units=units, seed=units),
+            SimulatorConditions(
+                latency=data.get(CONF_SIMULATOR_LATENCY, 0.0),
+                baudrate=data.get(CONF_SERIAL_BAUD) or None,
+                error_rate=data.get(CONF_SIMULATOR_ERROR_RATE, 0.0),
+            ),
+        )
+
+    if protocol == PROTOCOL_REPLAY:
+        return ReplayTransport(data[CONF_RECORDING_PATH], realtime=data.get(CONF_REPLAY_REALTIME, False))
+
     raise ValueError(f"Unsupported protocol {protocol}")
 
 
-async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    """Set up Coolmaster from a config entry."""
-    transport = _get_transport_from_config_data(entry.data)
+def _get_stream_transport(hass: HomeAssistant, data: dict) -> transports.BaseTransport | None:
+    """
+    Return a dedicated session to stream status over, so streaming does not hold up commands and polls,
+    or None if the gateway can not have one.
+
+    Only network gateways accept more than one session. Streaming over the one shared transport
+    would take it over with a listing every STREAM_INTERVAL, so the other protocols do not stream at all.
+    """
+    if data.get(CONF_PROTOCOL, PROTOCOL_SOCKET) == PROTOCOL_SOCKET:
+        return _get_transport_from_config_data(hass, data)
+
+    return None
 
-    try:
-        gateway = await models.Gateway.from_transport(transport)
-    except exceptions.CoolMasterNetRemoteError as exc:
-        raise ConfigEntryNotReady from exc
 
-    connections = set()
+async def async_discover_gateway(transport: transports.BaseTransport) -> tuple[models.Gateway, str, str | None]:
+    """
+    Discover a gateway from scratch, returning it along with its model and MAC address (if network-connected).
+    """
+    gateway = await models.Gateway.from_transport(transport)
 
-    if isinstance(transport, transports.NetworkTransportMixin):
+    mac = None
+
+    if isinstance(unwrap_transport(transport), transports.NetworkTransportMixin):
         ifconfig = await gateway.get_ifconfig()
-        connections = {(dr.CONNECTION_NETWORK_MAC, ifconfig["MAC"])}
-
-    # according to CoolAutomation, CoolMasterNet S/Ns begin with 283B960,
-    # CoolLinkHub's begin with 283B96C
-    if gateway.serial_number.startswith("283B960"):
-        model = "CoolMasterNet"
-    elif gateway.serial_number.startswith("283B96C"):
-        model = "CoolLinkHub"
-    else:
+        mac = ifconfig["MAC"]
+
+    if (model := gateway_model_from_serial_number(gateway.serial_number)) is None:
         # my CoolLinkHub unit doesn't begin with either one of them,
         # use fallback method of checking for CoolMasterNet-only commands
         try:
@@ -61,11 +154,50 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         else:
             model = "CoolMasterNet"
 
+    return gateway, model, mac
+
+
+async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Set up Coolmaster from a config entry."""
+    transport = _get_transport_from_config_data(hass, entry.data)
+
+    if entry.options.get(CONF_RECORD_TRAFFIC):
+        transport = RecordingTransport(
+            transport, hass.config.path(f"{DOMAIN}_{entry.unique_id or entry.entry_id}_{utcnow():%Y%m%d%H%M%S}.jsonl")
+        )
+
+        # entries are not unloaded when Home Assistant stops, so the transport would not get to write what is pending
+        entry.async_on_unload(hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, transport.async_flush))
+
+    # commands fail instantly while the gateway is unreachable, instead of queueing up behind connection timeouts
+    breaker = CircuitBreakerTransport(TelemetryTransport(transport))
+    transport = PriorityTransport(breaker)
+
+    # gateways discovered before are set up from cache, so entities exist even if the gateway is slow or unreachable
+    cached = await GatewayStore(hass, entry.unique_id).async_load() if entry.unique_id else None
+
+    if cached:
+        gateway = deserialize_gateway(transport, cached)
+        model, mac = cached["model"], cached["mac"]
+    else:
+        try:
+            gateway, model, mac = await async_discover_gateway(transport)
+        except (OSError, exceptions.CoolMasterNetRemoteError) as exc:
+            if close := getattr(transport, "async_close", None):
+                await close()
+
+            raise ConfigEntryNotReady from exc
+
+        if entry.unique_id is None:
+            hass.config_entries.async_update_entry(entry, unique_id=gateway.serial_number)
+
+        await GatewayStore(hass, gateway.serial_number).async_save_gateway(gateway, model, mac)
+
     device_registry = dr.async_get(hass)
 
     device_registry.async_get_or_create(
         config_entry_id=entry.entry_id,
-        connections=connections,
+        connections={(dr.CONNECTION_NETWORK_MAC, mac)} if mac else set(),
         identifiers={(DOMAIN, gateway.serial_number)},
         manufacturer="CoolAutomation",
         model=model,
@@ -73,35 +205,210 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         sw_version=gateway.version,
     )
 
-    coordinator = CoolmasterDataUpdateCoordinator(hass, gateway)
+    coordinator = CoolmasterDataUpdateCoordinator(
+        hass,
+        gateway,
+        model=model,
+        mac=mac,
+        scheduler=hass.data.setdefault(DOMAIN, {}).setdefault(DATA_SCHEDULER, PollScheduler()),
+        max_update_interval=timedelta(seconds=entry.options.get(CONF_MAX_SCAN_INTERVAL, DEFAULT_MAX_SCAN_INTERVAL)),
+    )
+
+    breaker.on_state = coordinator.async_gateway_reachability_changed
+
+    await coordinator.runtime.async_load()
 
-    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {
+    hass.data[DOMAIN][entry.entry_id] = {
         DATA_COORDINATOR: coordinator,
     }
 
-    await coordinator.async_config_entry_first_refresh()
+    if cached:
+        # entities stay unavailable until the gateway confirms the cached state, which is their data meanwhile
+        coordinator.data = gateway
+        coordinator.last_update_success = False
+        hass.async_create_task(coordinator.async_reconcile())
+    else:
+        await coordinator.async_config_entry_first_refresh()
 
     hass.config_entries.async_setup_platforms(entry, PLATFORMS)
 
+    if entry.options.get(CONF_STREAMING) and (stream_transport := _get_stream_transport(hass, entry.data)):
+        coordinator.async_start_stream(stream_transport)
+
+    if ambient_sensors := entry.options.get(CONF_AMBIENT_SENSORS):
+        feeder = AmbientTemperatureFeeder(
+            hass,
+            coordinator,
+            ambient_sensors,
+            deadband=entry.options.get(CONF_AMBIENT_DEADBAND, DEFAULT_AMBIENT_DEADBAND),
+            min_interval=entry.options.get(CONF_AMBIENT_MIN_INTERVAL, DEFAULT_AMBIENT_MIN_INTERVAL),
+        )
+        feeder.async_start()
+        entry.async_on_unload(feeder.async_stop)
+
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
+
+    # imported here as the services module depends on the platforms, which depend on this module
+    from .services import async_register_services
+
+    async_register_services(hass)
+
     return True
 
 
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the config entry when its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a Coolmaster config entry."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
 
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        entry_data = hass.data[DOMAIN].pop(entry.entry_id)
+        await entry_data[DATA_COORDINATOR].async_unload()
+
+        # the services are shared by all gateways, so they go away with the last one
+        if not any(other.entry_id in hass.data[DOMAIN] for other in hass.config_entries.async_entries(DOMAIN)):
+            from .services import async_unregister_services
+
+            async_unregister_services(hass)
 
     return unload_ok
 
 
+# public models.Device state properties mapped to the attributes backing them,
+# used to apply the expected outcome of a command before the gateway confirms it
+DEVICE_STATE_ATTRIBUTES = {
+    "power_state": "_power_state",
+    "mode": "_mode",
+    "fan_mode": "_fan_mode",
+    "target_temperature": "_target_temp",
+    "current_temperature": "_current_temp",
+    "louver_position": "_louver_position",
+    "filter_sign": "_filter_sign",
+}
+
+
+# models.Device properties making up a unit's dynamic state
+DEVICE_STATE_FIELDS = (
+    "power_state",
+    "mode",
+    "fan_mode",
+    "target_temperature",
+    "current_temperature",
+    "louver_position",
+    "error_code",
+    "filter_sign",
+    "demand",
+)
+
+# pseudo-field marking a unit's runtime statistics as changed, see CoolmasterDataUpdateCoordinator._update_runtime
+RUNTIME_FIELD = "runtime"
+
+# errors confined to a single unit, as opposed to connection errors which affect the whole gateway
+UNIT_ERRORS = (
+    exceptions.CoolMasterNetRemoteError,
+    exceptions.DeviceDisappearedException,
+    # malformed status lines
+    ValueError,
+    KeyError,
+    IndexError,
+)
+
+
+def _device_snapshot(device: models.Device) -> tuple:
+    """Return the values of a device's dynamic state, for cheap change detection between polls."""
+    return tuple(getattr(device, field) for field in DEVICE_STATE_FIELDS)
+
+
+def device_context(device: models.Device, fields: tuple[str, ...] = DEVICE_STATE_FIELDS) -> tuple[str, frozenset]:
+    """
+    Return the coordinator context for an entity of the given device, depending on the given state fields.
+
+    The coordinator only notifies an entity when one of its fields changed, see async_update_listeners.
+    """
+    return str(device.uid), frozenset(fields)
+
+
 class CoolmasterDataUpdateCoordinator(DataUpdateCoordinator):
-    """Class to manage fetching Coolmaster data."""
+    """
+    Class to manage fetching Coolmaster data.
+
+    The poll interval adapts to activity: it drops to FAST_SCAN_INTERVAL for FAST_SCAN_WINDOW
+    after a user command, then doubles after every poll without changes until max_update_interval is reached.
+    Any change resets it back to the default SCAN_INTERVAL.
+
+    After each poll only entities whose backing fields changed are notified, the number of state writes
+    avoided that way is counted in skipped_state_writes.
+
+    The duration of every poll, and of each unit within it, is recorded in poll_telemetry.
+
+    Polls are aligned to a phase given by the PollScheduler shared with other gateways, which also limits
+    how many gateways are polled at once.
+
+    A unit failing to refresh does not fail the poll: it alone is marked unavailable, left out of subsequent polls
+    and retried in the background with exponential backoff until it responds again.
 
-    def __init__(self, hass: HomeAssistant, gateway: models.Gateway) -> None:
+    When streaming, changes are applied as the StatusStream reports them and polls are only a consistency check
+    every max_update_interval, until the stream drops and regular polling takes over again.
+
+    Units added to or removed from the gateway are picked up from the gateway-wide listing of every poll,
+    without reloading the config entry.
+
+    Polls are tiered: every poll only gets the units' dynamic state, in a single gateway-wide listing if possible.
+    What rarely changes - unit properties (names, modes, fan speeds, temperature ranges), HVAC lines
+    and louver positions - is only refreshed every STATIC_REFRESH_INTERVAL or on demand, see async_refresh_static.
+    Louver positions take a command per unit, so a swing change made outside Home Assistant shows up late;
+    swing commands sent through Home Assistant are confirmed right away, see _async_refresh_device.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        gateway: models.Gateway,
+        model: str,
+        mac: str | None = None,
+        scheduler: PollScheduler | None = None,
+        max_update_interval: timedelta = timedelta(seconds=DEFAULT_MAX_SCAN_INTERVAL),
+    ) -> None:
         """Initialize global Coolmaster data updater."""
         self.gateway = gateway
+        self.model = model
+        self.mac = mac
+        self.store = GatewayStore(hass, gateway.serial_number)
+        self.bulk_poll = True
+        self.max_update_interval = max(max_update_interval, SCAN_INTERVAL)
+        self.commands = CommandQueue(hass, gateway)
+        self.scheduler = scheduler or PollScheduler()
+        self.scheduler.register(gateway.serial_number)
+        # monotonic time of the next scheduled poll
+        self._scheduled_poll: float | None = None
+        self.stream: StatusStream | None = None
+
+        self._fast_poll_until = None
+        # why update_interval is what it is: "default", "user_command", "changes", "idle" or "streaming"
+        self.update_interval_reason = "default"
+        self._snapshots: dict[str, tuple] = {}
+        # changed fields per UID since listeners were last notified, None to notify everything
+        self._changed_fields: dict[str, set[str]] | None = None
+        self._last_notified_success: bool | None = None
+        self.skipped_state_writes = 0
+        self._device_refreshers: dict[str, Debouncer] = {}
+        self._unsub_reconcile = None
+        self.poll_telemetry = PollTelemetry()
+        # polls - and while streaming or idle, updates - are up to max_update_interval apart, leave room for a slow one
+        self.runtime = RuntimeTracker(
+            hass, gateway.serial_number, max(RUNTIME_MAX_GAP, 2 * self.max_update_interval.total_seconds())
+        )
+        # consecutive failures per UID of units currently considered unavailable
+        self.unit_failures: dict[str, int] = {}
+        self._unit_retries: dict[str, CALLBACK_TYPE] = {}
+        # monotonic time of the last refresh of the slow tier, None to have it refreshed with the next poll
+        self._static_refreshed: float | None = time.monotonic()
+        # consecutive status listings each unit was missing from, see _async_sync_units
+        self._missing_units: dict[str, int] = {}
 
         super().__init__(
             hass,
@@ -112,12 +419,654 @@ class CoolmasterDataUpdateCoordinator(DataUpdateCoordinator):
 
     async def _async_update_data(self) -> models.Gateway:
         """Fetch data from Coolmaster."""
+        scheduled, self._scheduled_poll = self._scheduled_poll, None
+
+        try:
+            async with self.scheduler.async_poll_slot(self.gateway.serial_number, scheduled) as lag:
+                self.poll_telemetry.lags.record(lag)
+
+                if self.update_interval and lag > self.update_interval.total_seconds():
+                    _LOGGER.warning("Polls of %s can not keep up, lagging %.1fs behind schedule", self.gateway, lag)
+
+                return await self._async_poll()
+        except asyncio.TimeoutError as exc:
+            self.poll_telemetry.failed_polls += 1
+            raise UpdateFailed(f"Polling {self.gateway.transport} timed out") from exc
+
+    @callback
+    def _schedule_refresh(self) -> None:
+        """
+        Schedule the next poll aligned to this gateway's phase, see PollScheduler.next_poll_time.
+
+        Same as DataUpdateCoordinator._schedule_refresh otherwise.
+        """
+        if self.update_interval is None:
+            return
+
+        if self.config_entry and self.config_entry.pref_disable_polling:
+            return
+
+        if self._unsub_refresh:
+            self._unsub_refresh()
+            self._unsub_refresh = None
+
+        now = utcnow()
+        next_poll = self.scheduler.next_poll_time(self.gateway.serial_number, now, self.update_interval)
+        self._scheduled_poll = time.monotonic() + (next_poll - now).total_seconds()
+
+        self._unsub_refresh = event.async_track_point_in_utc_time(self.hass, self._job, next_poll)
+
+    async def _async_poll(self) -> models.Gateway:
+        started = time.monotonic()
 
         try:
-            for device in self.gateway.devices.values():
-                # refresh devices in-place so entities' references to these objects remain valid
-                await device.refresh()
+            ls_lines = await self._async_get_status_listing()
+
+            if ls_lines:
+                await self._async_sync_units(ls_lines)
+
+            if self._static_refreshed is None or time.monotonic() - self._static_refreshed >= STATIC_REFRESH_INTERVAL:
+                await self._async_refresh_static()
+
+            for uid, device in list(self.gateway.devices.items()):
+                if str(uid) in self.unit_failures:
+                    # retried separately, see _async_retry_unit
+                    continue
+
+                unit_started = time.monotonic()
+
+                try:
+                    await self._async_refresh_unit(device, ls_lines.get(str(uid)))
+                except UNIT_ERRORS as exc:
+                    self._async_unit_failed(device, exc)
+
+                # let commands issued meanwhile queue up for the transport, so they go ahead of the next unit
+                await asyncio.sleep(0)
+
+                # excludes the unit's share of the gateway-wide listing
+                self.poll_telemetry.unit_durations[str(uid)] = time.monotonic() - unit_started
         except (OSError, exceptions.CoolMasterNetRemoteError) as exc:
-            raise UpdateFailed from exc
+            self.poll_telemetry.failed_polls += 1
+            raise UpdateFailed(f"Polling {self.gateway.transport} failed: {exc!r}") from exc
         else:
+            self.poll_telemetry.polls.record(time.monotonic() - started)
+            changed = self._diff_snapshots()
+            self._update_runtime()
+            self._adapt_update_interval(changed)
+            self.store.async_delay_save(
+                partial(serialize_gateway, self.gateway, self.model, self.mac), GATEWAY_CACHE_SAVE_DELAY
+            )
             return self.gateway
+
+    async def _async_refresh_unit(
+        self, device: models.Device, ls_line: str | None = None, louver_position: bool = False
+    ) -> None:
+        """
+        Refresh a unit from its line of the gateway-wide listing if available, or by querying it otherwise.
+
+        The louver position takes a command of its own, so it is only refreshed if asked for.
+        """
+        if ls_line is None:
+            try:
+                ls_line = (await device.command("ls2", refresh=False))[0]
+            except exceptions.CoolMasterNetNoUidError as exc:
+                raise exceptions.DeviceDisappearedException(device.uid) from exc
+
+        # refresh devices in-place so entities' references to these objects remain valid
+        device._populate_from_ls_line(ls_line)
+
+        if louver_position:
+            await device._refresh_louver_position()
+
+    async def _async_refresh_static(self) -> None:
+        """
+        Refresh the slow tier: unit properties, HVAC lines and louver positions.
+
+        Changed louver positions are picked up like any other state change, changed properties
+        feed into names and capabilities so every entity is written in that case.
+        """
+        try:
+            await self.gateway.refresh_props()
+            await self.gateway.refresh_lines()
+        except (ValueError, KeyError, IndexError):
+            # a garbled response, the units keep what they have until the next poll tries again
+            _LOGGER.debug("Failed to refresh the properties and lines of %s", self.gateway, exc_info=True)
+            return
+
+        for uid, device in list(self.gateway.devices.items()):
+            if (properties := self.gateway.properties.get(uid, {})) != device.properties:
+                device.properties = properties
+                self._changed_fields = None
+
+            if uid not in self.gateway._coolplug_lines:
+                device.hvac_line = self.gateway.lines.get(uid.line_number, device.hvac_line)
+
+            if str(uid) in self.unit_failures:
+                continue
+
+            try:
+                await device._refresh_louver_position()
+            except UNIT_ERRORS as exc:
+                self._async_unit_failed(device, exc)
+
+            # same as polls, let commands issued meanwhile go ahead of the next unit
+            await asyncio.sleep(0)
+
+        self._static_refreshed = time.monotonic()
+
+    async def async_refresh_static(self) -> None:
+        """Refresh the slow tier right away, e.g. after the gateway's unit properties have been edited."""
+        self._static_refreshed = None
+        await self.async_refresh()
+
+    def is_unit_available(self, device: models.Device) -> bool:
+        return str(device.uid) not in self.unit_failures
+
+    @callback
+    def _async_unit_failed(self, device: models.Device, exc: Exception) -> None:
+        """
+        Mark a unit unavailable and schedule a retry, backing off exponentially with every consecutive failure.
+        """
+        uid = str(device.uid)
+        failures = self.unit_failures[uid] = self.unit_failures.get(uid, 0) + 1
+        delay = min(UNIT_RETRY_INTERVAL * 2 ** (failures - 1), UNIT_RETRY_MAX_INTERVAL)
+
+        if failures == 1:
+            _LOGGER.warning("Unit %s of %s failed to refresh, retrying in %ss: %r", uid, self.gateway, delay, exc)
+            self.async_update_device_listeners(device)
+        else:
+            _LOGGER.debug(
+                "Unit %s of %s failed to refresh %d times, retrying in %ss", uid, self.gateway, failures, delay
+            )
+
+        self._unit_retries[uid] = event.async_call_later(self.hass, delay, partial(self._async_retry_unit, device))
+
+    @callback
+    def _async_unit_recovered(self, device: models.Device) -> None:
+        uid = str(device.uid)
+
+        if self.unit_failures.pop(uid, None) is None:
+            return
+
+        if unsub := self._unit_retries.pop(uid, None):
+            unsub()
+
+        _LOGGER.info("Unit %s of %s is responding again", uid, self.gateway)
+
+    async def _async_retry_unit(self, device: models.Device, *_) -> None:
+        self._unit_retries.pop(str(device.uid), None)
+
+        try:
+            await self._async_refresh_unit(device, louver_position=True)
+        except (OSError, *UNIT_ERRORS) as exc:
+            self._async_unit_failed(device, exc)
+            return
+
+        self._async_unit_recovered(device)
+        self._snapshots[str(device.uid)] = _device_snapshot(device)
+        self.async_update_device_listeners(device)
+
+    async def _async_sync_units(self, ls_lines: dict[str, str]) -> None:
+        """
+        Bring the units in line with the gateway-wide listing: units appearing in it are added,
+        units missing from UNIT_REMOVAL_LISTINGS listings in a row are removed along with their entities.
+
+        Nothing happens to the units which are still there, so their entities are not disturbed.
+        """
+        added = []
+
+        for uid in ls_lines:
+            try:
+                if UID.from_string(uid) not in self.gateway.devices:
+                    added.append(uid)
+            except (ValueError, IndexError):
+                _LOGGER.debug("Ignoring garbled line of %s: %r", self.gateway, ls_lines[uid])
+
+        if added:
+            await self._async_add_units(added, ls_lines)
+
+        for uid in list(self.gateway.devices):
+            if str(uid) in ls_lines:
+                self._missing_units.pop(str(uid), None)
+                continue
+
+            self._missing_units[str(uid)] = self._missing_units.get(str(uid), 0) + 1
+
+            # a unit missing from a single listing may just be a garbled one
+            if self._missing_units[str(uid)] >= UNIT_REMOVAL_LISTINGS:
+                self._async_remove_unit(uid)
+
+    async def _async_add_units(self, uids: list[str], ls_lines: dict[str, str]) -> None:
+        """
+        Discover the given units the same way Gateway.refresh_devices does, and have their entities added.
+
+        Units which fail to be added, along with their line or properties, are tried again with the next listing.
+        """
+        try:
+            await self.gateway.refresh_props()
+
+            if any(UID.from_string(uid).line_number not in self.gateway.lines for uid in uids):
+                await self.gateway.refresh_lines()
+        except (ValueError, KeyError, IndexError):
+            _LOGGER.debug("Failed to refresh the properties and lines of %s", self.gateway, exc_info=True)
+            return
+
+        devices = []
+
+        for uid_string in uids:
+            uid = UID.from_string(uid_string)
+
+            try:
+                hvac_line = self.gateway.lines[uid.line_number]
+
+                if hvac_line.type in (constants.LineType.PLUGBUS, constants.LineType.PLUGBUS_WIRELESS):
+                    self.gateway._coolplug_lines[uid] = self.gateway._parse_lines_result(
+                        await self.gateway.transport.plug_command(uid, "line")
+                    )
+                    # according to CoolAutomation, the HVAC will always be on line 1 of a CoolPlug
+                    hvac_line = self.gateway._coolplug_lines[uid][1]
+
+                device = await models.Device.init_with_ls_line(
+                    self.gateway,
+                    ls_lines[uid_string],
+                    hvac_line=hvac_line,
+                    properties=self.gateway.properties.get(uid, {}),
+                )
+            except UNIT_ERRORS:
+                _LOGGER.debug("Failed to add unit %s of %s", uid, self.gateway, exc_info=True)
+                continue
+
+            _LOGGER.info("Unit %s added to %s", uid, self.gateway)
+
+            self.gateway._devices[uid] = device
+            devices.append(device)
+
+        if devices:
+            async_dispatcher_send(self.hass, SIGNAL_UNITS_ADDED.format(self.config_entry.entry_id), devices)
+
+    @callback
+    def _async_remove_unit(self, uid: UID) -> None:
+        """Forget a unit, removing its device from the registry takes its entities along."""
+        _LOGGER.info("Unit %s removed from %s", uid, self.gateway)
+
+        del self.gateway._devices[uid]
+        self.gateway._coolplug_lines.pop(uid, None)
+
+        uid_string = str(uid)
+
+        self._missing_units.pop(uid_string, None)
+        self._snapshots.pop(uid_string, None)
+        self.unit_failures.pop(uid_string, None)
+        self.runtime.units.pop(uid_string, None)
+
+        if unsub := self._unit_retries.pop(uid_string, None):
+            unsub()
+
+        if refresher := self._device_refreshers.pop(uid_string, None):
+            refresher.async_cancel()
+
+        device_registry = dr.async_get(self.hass)
+
+        if device_entry := device_registry.async_get_device({(DOMAIN, uid_string)}):
+            device_registry.async_remove_device(device_entry.id)
+
+    async def async_unload(self) -> None:
+        """Cancel any pending background work when the config entry is unloaded."""
+        for refresher in self._device_refreshers.values():
+            refresher.async_cancel()
+
+        for unsub in self._unit_retries.values():
+            unsub()
+
+        self._unit_retries.clear()
+        self.scheduler.unregister(self.gateway.serial_number)
+        await self.runtime.async_save()
+
+        if self.stream is not None:
+            await self.stream.async_stop()
+
+        if self._unsub_reconcile:
+            self._unsub_reconcile()
+            self._unsub_reconcile = None
+
+        if close := getattr(self.gateway.transport, "async_close", None):
+            await close()
+
+    async def async_reconcile(self, *_) -> None:
+        """
+        Bring a gateway restored from cache in line with the actual gateway, retrying until it is reachable.
+        """
+        self._unsub_reconcile = None
+
+        try:
+            await self.gateway.refresh_settings()
+            ls_lines = await self.gateway.transport.command("ls2")
+
+            # units added or removed since they were cached are picked up the same way as at runtime
+            await self._async_sync_units({line.split(maxsplit=1)[0]: line for line in ls_lines if line.strip()})
+        except (OSError, exceptions.CoolMasterNetRemoteError):
+            _LOGGER.debug("Gateway %s not reachable yet, retrying later", self.gateway, exc_info=True)
+            self._unsub_reconcile = event.async_call_later(
+                self.hass, GATEWAY_RECONCILE_RETRY_INTERVAL, self.async_reconcile
+            )
+            return
+
+        # the cached properties may be out of date, and feed into names and capabilities
+        # so every entity needs to be written
+        self._static_refreshed = None
+        self._changed_fields = None
+        await self.async_refresh()
+
+        if self.last_update_success:
+            await self.store.async_save_gateway(self.gateway, self.model, self.mac)
+
+    @callback
+    def async_gateway_reachability_changed(self, reachable: bool) -> None:
+        """
+        Catch up as soon as the gateway is reachable again, see CircuitBreakerTransport, rather than on the next poll.
+        """
+        if not reachable:
+            return
+
+        if self._unsub_reconcile:
+            self._unsub_reconcile()
+            self._unsub_reconcile = None
+            self.hass.async_create_task(self.async_reconcile())
+        else:
+            self.hass.async_create_task(self.async_request_refresh())
+
+    async def async_unit_control(self, device: models.Device, command: Awaitable, **expected_state: Any) -> None:
+        """
+        Await a unit command, optimistically showing its expected outcome in the meantime.
+
+        The expected state is applied to the device and its entities right away. Once the command completes
+        (or fails) only this unit is refreshed - after a short cooldown so a burst of commands
+        results in a single refresh - which either confirms the optimistic state or rolls it back.
+        """
+        self.async_apply_expected_state(device, **expected_state)
+
+        try:
+            await command
+        finally:
+            self.async_request_fast_poll()
+            await self._get_device_refresher(device).async_call()
+
+    @callback
+    def async_apply_expected_state(self, device: models.Device, **expected_state: Any) -> None:
+        """
+        Show the expected outcome of a command on the device and its entities, until the next refresh tells otherwise.
+        """
+        for name, value in expected_state.items():
+            setattr(device, DEVICE_STATE_ATTRIBUTES[name], value)
+
+        # the snapshot no longer describes what the entities show, so the next refresh notifies them
+        # whatever it reads back, rolling the expected state back if the command did not take
+        self._snapshots.pop(str(device.uid), None)
+
+        self.async_update_device_listeners(device)
+
+    def _get_device_refresher(self, device: models.Device) -> Debouncer:
+        if (refresher := self._device_refreshers.get(str(device.uid))) is None:
+            refresher = self._device_refreshers[str(device.uid)] = Debouncer(
+                self.hass,
+                _LOGGER,
+                cooldown=DEVICE_REFRESH_COOLDOWN,
+                immediate=False,
+                function=partial(self._async_refresh_device, device),
+            )
+
+        return refresher
+
+    async def _async_refresh_device(self, device: models.Device) -> None:
+        # the user is waiting for this to confirm their command
+        command_priority.set(PRIORITY_INTERACTIVE)
+
+        try:
+            # the command may have been a louver command, so the louver position is confirmed too
+            await self._async_refresh_unit(device, louver_position=True)
+        except (OSError, *UNIT_ERRORS):
+            # the state will be corrected by the next regular poll instead, which notifies the entities
+            # since the snapshot was dropped along with the expected state
+            _LOGGER.debug("Failed to refresh %s after a command", device, exc_info=True)
+        else:
+            self._async_unit_recovered(device)
+            # the entities are notified right below, so the next poll should not consider this a change
+            self._snapshots[str(device.uid)] = _device_snapshot(device)
+
+        self.async_update_device_listeners(device)
+
+    async def async_bulk_control(
+        self,
+        devices: list[models.Device] | None = None,
+        power_state: bool | None = None,
+        mode: constants.Mode | None = None,
+        temperature: float | None = None,
+    ) -> None:
+        """
+        Control several units at once, or all of them if no devices are given.
+
+        Power for the whole gateway goes out as a single "allon"/"alloff" command, falling back to per-unit commands
+        if the gateway does not support it. Everything else is queued together so it goes out as one pipelined batch,
+        and a single poll afterwards reconciles the state of every unit rather than refreshing them one by one.
+        """
+        all_units = devices is None or {str(device.uid) for device in devices} == {
+            str(uid) for uid in self.gateway.devices
+        }
+        devices = list(self.gateway.devices.values()) if devices is None else devices
+
+        expected_state = {
+            name: value
+            for name, value in (("power_state", power_state), ("mode", mode), ("target_temperature", temperature))
+            if value is not None
+        }
+
+        for device in devices:
+            for name, value in expected_state.items():
+                setattr(device, DEVICE_STATE_ATTRIBUTES[name], value)
+
+            # same as async_apply_expected_state, so units the commands did not take on are rolled back
+            self._snapshots.pop(str(device.uid), None)
+
+        self.async_update_device_listeners(*devices)
+
+        commands = []
+
+        if mode is not None:
+            commands += [self.commands.async_set_mode(device, mode) for device in devices]
+
+        if temperature is not None:
+            commands += [self.commands.async_set_temperature(device, temperature) for device in devices]
+
+        if power_state is not None:
+            if all_units:
+                commands.append(self._async_set_all_power_states(power_state))
+            else:
+                commands += [self.commands.async_set_power_state(device, power_state) for device in devices]
+
+        results = await asyncio.gather(*commands, return_exceptions=True)
+
+        self.async_request_fast_poll()
+        await self.async_refresh()
+
+        if errors := [result for result in results if isinstance(result, Exception)]:
+            raise errors[0]
+
+    async def _async_set_all_power_states(self, power_state: bool) -> None:
+        try:
+            await self.commands.async_set_all_power_states(power_state)
+        except exceptions.CoolMasterNetUnknownCommandError:
+            _LOGGER.debug("%s does not support all-unit commands, switching units one by one", self.gateway)
+
+            await asyncio.gather(
+                *(self.commands.async_set_power_state(device, power_state) for device in self.gateway.devices.values())
+            )
+
+    @callback
+    def async_start_stream(self, transport: transports.BaseTransport) -> None:
+        self.stream = StatusStream(transport, self._async_apply_stream_changes, self._async_stream_state_changed)
+        self.stream.start()
+
+    @callback
+    def _async_apply_stream_changes(self, changes: dict[str, str]) -> None:
+        devices = {str(uid): device for uid, device in self.gateway.devices.items()}
+
+        for uid, ls_line in changes.items():
+            if (device := devices.get(uid)) is None or uid in self.unit_failures:
+                continue
+
+            try:
+                device._populate_from_ls_line(ls_line)
+            except (ValueError, KeyError):
+                _LOGGER.debug("Ignoring malformed status line from stream: %s", ls_line)
+
+        if self._diff_snapshots():
+            self._update_runtime()
+            self.async_update_listeners()
+
+    @callback
+    def _async_stream_state_changed(self, connected: bool) -> None:
+        self.update_interval = self.max_update_interval if connected else SCAN_INTERVAL
+        self.update_interval_reason = "streaming" if connected else "default"
+        self._schedule_refresh()
+
+    @callback
+    def async_update_device_listeners(self, *devices: models.Device) -> None:
+        """
+        Notify only the entities of the given devices, as opposed to async_update_listeners which notifies all of them.
+        """
+        uids = {str(device.uid) for device in devices}
+
+        for update_callback, context in list(self._listeners.values()):
+            if context is not None and context[0] in uids:
+                update_callback()
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """
+        Notify the entities whose backing fields changed since the last poll.
+
+        Everyone is notified when availability changes or when changes are not known,
+        e.g. on the first refresh or after the unit properties have been refreshed.
+        """
+        changed_fields, self._changed_fields = self._changed_fields, {}
+
+        notify_all = changed_fields is None or self.last_update_success != self._last_notified_success
+        self._last_notified_success = self.last_update_success
+
+        for update_callback, context in list(self._listeners.values()):
+            if notify_all or context is None or not changed_fields.get(context[0], set()).isdisjoint(context[1]):
+                update_callback()
+            else:
+                self.skipped_state_writes += 1
+
+    def _diff_snapshots(self) -> bool:
+        """
+        Take a new snapshot of every device, accumulating which fields changed since the previous one.
+
+        Returns whether anything changed.
+        """
+        changed = False
+
+        for uid, device in self.gateway.devices.items():
+            snapshot = _device_snapshot(device)
+            previous = self._snapshots.get(str(uid))
+
+            if snapshot == previous:
+                continue
+
+            changed = True
+            self._snapshots[str(uid)] = snapshot
+
+            if self._changed_fields is None:
+                continue
+
+            if previous is None:
+                self._changed_fields[str(uid)] = set(DEVICE_STATE_FIELDS)
+            else:
+                self._changed_fields.setdefault(str(uid), set()).update(
+                    field for field, old, new in zip(DEVICE_STATE_FIELDS, previous, snapshot) if old != new
+                )
+
+        return changed
+
+    @callback
+    def _update_runtime(self) -> None:
+        """
+        Account for the runtime of the units since the last update, see RuntimeTracker.
+
+        The runtime sensors are only notified when their rounded values changed.
+        """
+        changed = self.runtime.update(
+            {str(uid): device for uid, device in self.gateway.devices.items() if str(uid) not in self.unit_failures}
+        )
+
+        if self._changed_fields is not None:
+            for uid in changed:
+                self._changed_fields.setdefault(uid, set()).add(RUNTIME_FIELD)
+
+    @callback
+    def async_request_fast_poll(self) -> None:
+        """
+        Switch to fast polling for a while, so the outcome of a user command is reflected promptly.
+        """
+        if self.stream is not None and self.stream.connected:
+            # the stream reflects the outcome within a second anyway
+            return
+
+        self._fast_poll_until = utcnow() + FAST_SCAN_WINDOW
+        self.update_interval_reason = "user_command"
+
+        if self.update_interval != FAST_SCAN_INTERVAL:
+            self.update_interval = FAST_SCAN_INTERVAL
+            self._schedule_refresh()
+
+    def _adapt_update_interval(self, changed: bool) -> None:
+        """
+        Pick the interval until the next poll based on whether anything changed since the last one.
+        """
+        if self.stream is not None and self.stream.connected:
+            self.update_interval = self.max_update_interval
+            self.update_interval_reason = "streaming"
+            return
+
+        if self._fast_poll_until is not None:
+            if utcnow() < self._fast_poll_until:
+                self.update_interval = FAST_SCAN_INTERVAL
+                self.update_interval_reason = "user_command"
+                return
+
+            self._fast_poll_until = None
+            self.update_interval = SCAN_INTERVAL
+            self.update_interval_reason = "default"
+            return
+
+        if changed:
+            self.update_interval = SCAN_INTERVAL
+            self.update_interval_reason = "changes"
+        else:
+            self.update_interval = min(self.update_interval * 2, self.max_update_interval)
+            self.update_interval_reason = "idle"
+
+        _LOGGER.debug("Next poll of %s in %s", self.gateway, self.update_interval)
+
+    async def _async_get_status_listing(self) -> dict[str, str]:
+        """
+        Return the gateway-wide "ls2" listing keyed by UID, so all units can be refreshed in a single pass.
+
+        Returns an empty mapping if bulk polling is disabled or not supported by the gateway,
+        in which case every unit falls back to an individual refresh. Any other error fails the poll as usual,
+        a gateway having a bad moment should not lose bulk polling for good.
+        """
+        if not self.bulk_poll:
+            return {}
+
+        try:
+            ls_lines = await self.gateway.transport.command("ls2")
+        except (exceptions.CoolMasterNetUnknownCommandError, exceptions.CoolMasterNetBadFormatError):
+            _LOGGER.warning(
+                "Gateway-wide status listing not supported, falling back to per-unit refresh", exc_info=True
+            )
+            self.bulk_poll = False
+            return {}
+
+        return {line.split(maxsplit=1)[0]: line for line in ls_lines if line.strip()}
@@ -0,0 +1,156 @@
+"""Feeding the ambient temperature measured by Home Assistant sensors to the units."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from decimal import Decimal
+from typing import TYPE_CHECKING
+
+from homeassistant.const import (
+    ATTR_UNIT_OF_MEASUREMENT,
+    STATE_UNAVAILABLE,
+    STATE_UNKNOWN,
+    TEMP_CELSIUS,
+    TEMP_FAHRENHEIT,
+)
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, State, callback
+from homeassistant.helpers.event import async_call_later, async_track_state_change_event
+from homeassistant.util.temperature import convert as convert_temperature
+from pycoolmasternet_ng import exceptions, models
+from pycoolmasternet_ng.structures import UID
+
+from .const import AMBIENT_FEED_BATCH_DELAY
+
+if TYPE_CHECKING:
+    from . import CoolmasterDataUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+GATEWAY_TEMPERATURE_UNITS = {"C": TEMP_CELSIUS, "F": TEMP_FAHRENHEIT}
+
+
+class AmbientTemperatureFeeder:
+    """
+    Feeds the state of temperature sensors bound to units with the "feed" command.
+
+    A value is only fed if it differs from the last one fed to the unit by at least the deadband,
+    and no more than once every min_interval per unit - the latest value is fed once the interval has passed.
+    Values are collected for AMBIENT_FEED_BATCH_DELAY so changes of several sensors go out as one batch.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        coordinator: CoolmasterDataUpdateCoordinator,
+        bindings: dict[str, str],
+        deadband: float,
+        min_interval: float,
+    ) -> None:
+        """
+        :param bindings: sensor entity IDs keyed by unit UID
+        """
+        self.hass = hass
+        self.coordinator = coordinator
+        self.deadband = deadband
+        self.min_interval = min_interval
+
+        self._units = {entity_id: uid for uid, entity_id in bindings.items()}
+        self._last_fed: dict[str, tuple[float, float]] = {}
+        self._pending: dict[str, float] = {}
+        self._unsub_state: CALLBACK_TYPE | None = None
+        self._unsub_flush: CALLBACK_TYPE | None = None
+
+    @callback
+    def async_start(self) -> None:
+        self._unsub_state = async_track_state_change_event(self.hass, list(self._units), self._async_state_changed)
+
+        for entity_id in self._units:
+            if state := self.hass.states.get(entity_id):
+                self._async_handle_state(entity_id, state)
+
+    @callback
+    def async_stop(self) -> None:
+        for unsub in (self._unsub_state, self._unsub_flush):
+            if unsub:
+                unsub()
+
+        self._unsub_state = self._unsub_flush = None
+
+    @callback
+    def _async_state_changed(self, event: Event) -> None:
+        if (state := event.data.get("new_state")) is not None:
+            self._async_handle_state(event.data["entity_id"], state)
+
+    @callback
+    def _async_handle_state(self, entity_id: str, state: State) -> None:
+        uid = self._units[entity_id]
+
+        if (device := self._get_device(uid)) is None or state.state in (STATE_UNKNOWN, STATE_UNAVAILABLE):
+            return
+
+        try:
+            value = float(state.state)
+        except ValueError:
+            return
+
+        gateway_unit = GATEWAY_TEMPERATURE_UNITS.get(device.temperature_unit, TEMP_CELSIUS)
+        sensor_unit = state.attributes.get(ATTR_UNIT_OF_MEASUREMENT, gateway_unit)
+
+        if sensor_unit != gateway_unit:
+            value = convert_temperature(value, sensor_unit, gateway_unit)
+
+        if (last_fed := self._last_fed.get(uid)) is not None and abs(value - last_fed[0]) < self.deadband:
+            # back within the deadband, whatever was pending is moot
+            self._pending.pop(uid, None)
+            return
+
+        self._pending[uid] = value
+        self._schedule_flush()
+
+    @callback
+    def _schedule_flush(self, delay: float = AMBIENT_FEED_BATCH_DELAY) -> None:
+        if self._unsub_flush is None:
+            self._unsub_flush = async_call_later(self.hass, delay, self._async_flush)
+
+    async def _async_flush(self, *_) -> None:
+        self._unsub_flush = None
+        now = time.monotonic()
+
+        due = {
+            uid: value
+            for uid, value in self._pending.items()
+            if uid not in self._last_fed or now - self._last_fed[uid][1] >= self.min_interval
+        }
+
+        for uid in due:
+            del self._pending[uid]
+
+        if self._pending:
+            # the rest waits for its minimum interval to pass
+            self._schedule_flush(
+                max(min(self._last_fed[uid][1] + self.min_interval - now for uid in self._pending), 0)
+                + AMBIENT_FEED_BATCH_DELAY
+            )
+
+        # queued together, so they go out in the same pipelined batch
+        await asyncio.gather(*(self._async_feed(uid, value, now) for uid, value in due.items()))
+
+    async def _async_feed(self, uid: str, value: float, now: float) -> None:
+        if (device := self._get_device(uid)) is None:
+            return
+
+        try:
+            await self.coordinator.commands.async_set_current_temperature(device, value)
+        except (OSError, exceptions.CoolMasterNetRemoteError) as exc:
+            # left for the sensor's next change to retry
+            _LOGGER.debug("Failed to feed ambient temperature to %s: %r", uid, exc)
+            return
+
+        _LOGGER.debug("Fed %.1f as ambient temperature to %s", value, uid)
+
+        self._last_fed[uid] = (value, now)
+        self.coordinator.async_apply_expected_state(device, current_temperature=Decimal(f"{value:.1f}"))
+
+    def _get_device(self, uid: str) -> models.Device | None:
+        return self.coordinator.gateway.devices.get(UID.from_string(uid))
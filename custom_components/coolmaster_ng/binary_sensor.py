@@ -2,13 +2,15 @@ from __future__ import annotations
 
 from homeassistant.components.binary_sensor import BinarySensorDeviceClass, BinarySensorEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity, DataUpdateCoordinator
 from pycoolmasternet_ng import models
 
-from .const import DATA_COORDINATOR, DOMAIN
+from . import device_context
+from .const import DATA_COORDINATOR, DOMAIN, SIGNAL_UNITS_ADDED
 from .mixins import UtilityEntityMixin
 
 
@@ -21,33 +23,44 @@ async def async_setup_entry(
     entry_data = hass.data[DOMAIN][config_entry.entry_id]
     coordinator = entry_data[DATA_COORDINATOR]
 
-    gateway: models.Gateway = coordinator.data
+    gateway: models.Gateway = coordinator.gateway
 
-    new_devices: list[BaseDeviceBinarySensor] = []
+    @callback
+    def async_add_units(devices: list[models.Device]) -> None:
+        new_devices: list[BaseDeviceBinarySensor] = []
 
-    for device in gateway.devices.values():
-        new_devices.append(
-            FilterSensor(
-                coordinator=coordinator,
-                device=device,
+        for device in devices:
+            new_devices.append(
+                FilterSensor(
+                    coordinator=coordinator,
+                    device=device,
+                )
             )
-        )
 
-        new_devices.append(
-            DemandSensor(
-                coordinator=coordinator,
-                device=device,
+            new_devices.append(
+                DemandSensor(
+                    coordinator=coordinator,
+                    device=device,
+                )
             )
-        )
 
-        new_devices.append(ErrorSensor(coordinator=coordinator, device=device))
+            new_devices.append(ErrorSensor(coordinator=coordinator, device=device))
 
-    if new_devices:
-        async_add_entities(new_devices)
+        if new_devices:
+            async_add_entities(new_devices)
+
+    async_add_units(list(gateway.devices.values()))
+
+    # units added to the gateway later on, see CoolmasterDataUpdateCoordinator._async_sync_units
+    config_entry.async_on_unload(
+        async_dispatcher_connect(hass, SIGNAL_UNITS_ADDED.format(config_entry.entry_id), async_add_units)
+    )
 
 
 class BaseDeviceBinarySensor(UtilityEntityMixin, CoordinatorEntity, BinarySensorEntity):
     title = "Base Device Binary Sensor"
+    # models.Device fields the state depends on
+    state_fields: tuple[str, ...] = ()
 
     def __init__(
         self,
@@ -56,11 +69,12 @@ class BaseDeviceBinarySensor(UtilityEntityMixin, CoordinatorEntity, BinarySensor
     ) -> None:
         self.device = device
 
-        super().__init__(coordinator=coordinator)
+        super().__init__(coordinator=coordinator, context=device_context(device, self.state_fields))
 
 
 class FilterSensor(BaseDeviceBinarySensor):
     title = "Filter"
+    state_fields = ("filter_sign",)
     _attr_entity_category = EntityCategory.DIAGNOSTIC
     _attr_icon = "mdi:air-filter"
     _attr_device_class = BinarySensorDeviceClass.PROBLEM
@@ -72,6 +86,7 @@ class FilterSensor(BaseDeviceBinarySensor):
 
 class DemandSensor(BaseDeviceBinarySensor):
     title = "Demand"
+    state_fields = ("demand",)
     _attr_entity_category = EntityCategory.DIAGNOSTIC
     _attr_device_class = BinarySensorDeviceClass.RUNNING
 
@@ -82,6 +97,7 @@ class DemandSensor(BaseDeviceBinarySensor):
 
 class ErrorSensor(BaseDeviceBinarySensor):
     title = "Error"
+    state_fields = ("error_code",)
     _attr_entity_category = EntityCategory.DIAGNOSTIC
     _attr_device_class = BinarySensorDeviceClass.PROBLEM
 
@@ -2,12 +2,14 @@ from __future__ import annotations
 
 from homeassistant.components.button import ButtonEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.entity import EntityCategory
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity import DeviceInfo, EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from pycoolmasternet_ng import models
 
-from .const import DATA_COORDINATOR, DOMAIN
+from . import CoolmasterDataUpdateCoordinator
+from .const import DATA_COORDINATOR, DOMAIN, SIGNAL_UNITS_ADDED
 from .mixins import UtilityEntityMixin
 
 
@@ -20,19 +22,31 @@ async def async_setup_entry(
     entry_data = hass.data[DOMAIN][config_entry.entry_id]
     coordinator = entry_data[DATA_COORDINATOR]
 
-    gateway: models.Gateway = coordinator.data
+    gateway: models.Gateway = coordinator.gateway
 
-    new_devices: list[ButtonEntity] = []
+    async_add_entities([RefreshPropertiesButton(coordinator)])
 
-    for device in gateway.devices.values():
-        new_devices.append(
-            FilterResetButton(
-                device=device,
+    @callback
+    def async_add_units(devices: list[models.Device]) -> None:
+        new_devices: list[ButtonEntity] = []
+
+        for device in devices:
+            new_devices.append(
+                FilterResetButton(
+                    coordinator=coordinator,
+                    device=device,
+                )
             )
-        )
 
-    if new_devices:
-        async_add_entities(new_devices)
+        if new_devices:
+            async_add_entities(new_devices)
+
+    async_add_units(list(gateway.devices.values()))
+
+    # units added to the gateway later on, see CoolmasterDataUpdateCoordinator._async_sync_units
+    config_entry.async_on_unload(
+        async_dispatcher_connect(hass, SIGNAL_UNITS_ADDED.format(config_entry.entry_id), async_add_units)
+    )
 
 
 class FilterResetButton(UtilityEntityMixin, ButtonEntity):
@@ -40,8 +54,31 @@ class FilterResetButton(UtilityEntityMixin, ButtonEntity):
     _attr_icon = "mdi:air-filter"
     _attr_entity_category = EntityCategory.CONFIG
 
-    def __init__(self, device: models.Device) -> None:
+    def __init__(self, coordinator: CoolmasterDataUpdateCoordinator, device: models.Device) -> None:
+        self.coordinator = coordinator
         self.device = device
 
     async def async_press(self) -> None:
-        await self.device.reset_filter_sign(refresh=False)
+        await self.coordinator.async_unit_control(
+            self.device, self.coordinator.commands.async_reset_filter_sign(self.device), filter_sign=False
+        )
+
+
+class RefreshPropertiesButton(ButtonEntity):
+    """Picks up edits to the units' properties without waiting for them to be refreshed on their own."""
+
+    title = "Refresh properties"
+    _attr_icon = "mdi:refresh"
+    _attr_entity_category = EntityCategory.CONFIG
+
+    def __init__(self, coordinator: CoolmasterDataUpdateCoordinator) -> None:
+        self.coordinator = coordinator
+
+        serial_number = coordinator.gateway.serial_number
+
+        self._attr_device_info = DeviceInfo(identifiers={(DOMAIN, serial_number)})
+        self._attr_unique_id = serial_number + "-" + self.title.lower().replace(" ", "_")
+        self._attr_name = f"{serial_number} {self.title}"
+
+    async def async_press(self) -> None:
+        await self.coordinator.async_refresh_static()
@@ -1,7 +1,10 @@
 """CoolMasterNet platform to control of CoolMasterNet Climate Devices."""
 from __future__ import annotations
 
+import asyncio
 import logging
+from decimal import Decimal
+from typing import NamedTuple
 
 import voluptuous as vol
 from homeassistant.components.climate import ClimateEntity
@@ -22,13 +25,16 @@ from homeassistant.components.climate.const import (
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import ATTR_TEMPERATURE, TEMP_CELSIUS, TEMP_FAHRENHEIT
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback, async_get_current_platform
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from pycoolmasternet_ng import constants, models
 
-from .const import DATA_COORDINATOR, DOMAIN, SERVICE_SET_AMBIENT_TEMPERATURE
+from . import device_context
+from .const import DATA_COORDINATOR, DOMAIN, SERVICE_SET_AMBIENT_TEMPERATURE, SIGNAL_UNITS_ADDED
+from .runtime import device_hvac_action
 
 CM_TO_HA_STATE = {
     constants.Mode.HEAT: HVACMode.HEAT,
@@ -66,6 +72,8 @@ CM_TO_HA_SWING_STATE = {
     constants.LouverPositionState.SIXTY_DEGREES: SWING_60_DEGREES,
 }
 
+SWING_MODES = list(CM_TO_HA_SWING_STATE.values())
+
 HA_SWING_MODE_TO_CM = {
     SWING_ON: constants.LouverPosition.SWING,
     SWING_OFF: constants.LouverPosition.STOP_SWING,
@@ -76,9 +84,29 @@ HA_SWING_MODE_TO_CM = {
     SWING_60_DEGREES: constants.LouverPosition.SIXTY_DEGREES,
 }
 
+# models.Device fields the climate entity's state depends on
+CLIMATE_STATE_FIELDS = (
+    "power_state",
+    "mode",
+    "fan_mode",
+    "target_temperature",
+    "current_temperature",
+    "louver_position",
+    "demand",
+)
+
 _LOGGER = logging.getLogger(__name__)
 
 
+class _Capabilities(NamedTuple):
+    louver_supported: bool
+    supported_features: int
+    hvac_modes: list[HVACMode]
+    fan_modes: list[str]
+    swing_modes: list[str] | None
+    device_info: DeviceInfo
+
+
 async def async_setup_entry(
     hass: HomeAssistant,
     config_entry: ConfigEntry,
@@ -88,11 +116,18 @@ async def async_setup_entry(
     entry_data = hass.data[DOMAIN][config_entry.entry_id]
     coordinator = entry_data[DATA_COORDINATOR]
 
-    gateway: models.Gateway = coordinator.data
+    gateway: models.Gateway = coordinator.gateway
+
+    @callback
+    def async_add_units(devices: list[models.Device]) -> None:
+        async_add_devices([CoolmasterClimate(coordinator=coordinator, device=device) for device in devices])
 
-    all_devices = [CoolmasterClimate(coordinator=coordinator, device=device) for device in gateway.devices.values()]
+    async_add_units(list(gateway.devices.values()))
 
-    async_add_devices(all_devices)
+    # units added to the gateway later on, see CoolmasterDataUpdateCoordinator._async_sync_units
+    config_entry.async_on_unload(
+        async_dispatcher_connect(hass, SIGNAL_UNITS_ADDED.format(config_entry.entry_id), async_add_units)
+    )
 
     platform = async_get_current_platform()
 
@@ -112,46 +147,81 @@ class CoolmasterClimate(CoordinatorEntity, ClimateEntity):
 
     def __init__(self, coordinator, device: models.Device):
         """Initialize the climate device."""
-        super().__init__(coordinator)
+        super().__init__(coordinator, context=device_context(device, CLIMATE_STATE_FIELDS))
 
         self.device: models.Device = device
 
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return device info for this device."""
+        self._attr_unique_id = str(device.uid) + "-climate"
 
-        return DeviceInfo(
-            identifiers={(DOMAIN, str(self.device.uid))},
-            manufacturer=self.device.brand_name,
-            name=self.name,
-            via_device=(DOMAIN, self.device.gateway.serial_number),
-        )
+        self._capabilities: _Capabilities | None = None
+        self._capabilities_properties: dict | None = None
 
     @property
-    def unique_id(self) -> str:
-        return str(self.device.uid) + "-climate"
+    def available(self) -> bool:
+        return super().available and self.coordinator.is_unit_available(self.device)
 
     @property
-    def supported_features(self) -> int:
+    def capabilities(self) -> _Capabilities:
+        """
+        Return the values derived from the unit's properties, computed once and cached until the properties change.
+        """
+        louver_supported = self.device.louver_position != constants.LouverPositionState.NOT_SUPPORTED
+
+        if (
+            self._capabilities is not None
+            and self._capabilities.louver_supported == louver_supported
+            and (
+                self._capabilities_properties is self.device.properties
+                or self._capabilities_properties == self.device.properties
+            )
+        ):
+            # properties are replaced rather than mutated when refreshed, so next time the identity check suffices
+            self._capabilities_properties = self.device.properties
+            return self._capabilities
+
+        hvac_modes = [CM_TO_HA_STATE[mode] for mode in self.device.supported_modes if mode in CM_TO_HA_STATE]
+        fan_modes = [CM_TO_HA_FAN_MODE[mode] for mode in self.device.supported_fan_speeds if mode in CM_TO_HA_FAN_MODE]
+
         flags: int = ClimateEntityFeature.TARGET_TEMPERATURE
 
         # only set this if supported by the device
-        if self.device.louver_position != constants.LouverPositionState.NOT_SUPPORTED:
+        if louver_supported:
             flags |= ClimateEntityFeature.SWING_MODE
 
         # only set this if the device has defined fan speeds (in CoolMasterNet properties)
-        if self.fan_modes:
+        if fan_modes:
             flags |= ClimateEntityFeature.FAN_MODE
 
-        return flags
+        self._capabilities = _Capabilities(
+            louver_supported=louver_supported,
+            supported_features=flags,
+            hvac_modes=hvac_modes + [HVACMode.OFF],
+            fan_modes=fan_modes,
+            # only return a value if the device supports it
+            swing_modes=SWING_MODES if louver_supported else None,
+            device_info=DeviceInfo(
+                identifiers={(DOMAIN, str(self.device.uid))},
+                manufacturer=self.device.brand_name,
+                name=self.device.friendly_name,
+                via_device=(DOMAIN, self.device.gateway.serial_number),
+            ),
+        )
+        self._capabilities_properties = self.device.properties
+
+        return self._capabilities
 
     @property
-    def swing_modes(self) -> list[str] | None:
-        # only return a value if the device supports it
-        if self.device.louver_position != constants.LouverPositionState.NOT_SUPPORTED:
-            return list(CM_TO_HA_SWING_STATE.values())
+    def device_info(self) -> DeviceInfo:
+        """Return device info for this device."""
+        return self.capabilities.device_info
 
-        return None
+    @property
+    def supported_features(self) -> int:
+        return self.capabilities.supported_features
+
+    @property
+    def swing_modes(self) -> list[str] | None:
+        return self.capabilities.swing_modes
 
     @property
     def swing_mode(self) -> str | None:
@@ -216,59 +286,15 @@ class CoolmasterClimate(CoordinatorEntity, ClimateEntity):
 
     @property
     def hvac_action(self) -> HVACAction:
-        """
-        Return the current "action" (whether the unit is currently heating/cooling/etc).
-
-        We use a combination of the "demand" flag as well as comparing current & target temperatures
-        to account for cases where the demand flag is always set to False.
-        """
-
-        if self.hvac_mode == HVACMode.FAN_ONLY:
-            return HVACAction.FAN
-
-        if self.hvac_mode == HVACMode.DRY:
-            return HVACAction.DRYING
-
-        if self.hvac_mode in (HVACMode.HEAT, HVACMode.COOL, HVACMode.HEAT_COOL):
-            unit_no_demand = not self.device.demand
-
-            # note that not all units set the "demand" flag, thus we also fall back to checking
-            # whether the current temperature is around the target temperature
-
-            if self.hvac_mode == HVACMode.HEAT:
-                return (
-                    HVACAction.IDLE
-                    if unit_no_demand and self.current_temperature >= self.target_temperature
-                    else HVACAction.HEATING
-                )
-
-            if self.hvac_mode == HVACMode.COOL:
-                return (
-                    HVACAction.IDLE
-                    if unit_no_demand and self.current_temperature <= self.target_temperature
-                    else HVACAction.COOLING
-                )
-
-            if self.hvac_mode == HVACMode.HEAT_COOL:
-                if self.current_temperature == self.target_temperature:
-                    return HVACAction.IDLE
-
-                if self.current_temperature > self.target_temperature:
-                    return HVACAction.COOLING
-
-                return HVACAction.HEATING
-
-        return HVACAction.OFF
+        return device_hvac_action(self.device)
 
     @property
     def hvac_modes(self) -> list[HVACMode]:
-        return [CM_TO_HA_STATE[mode] for mode in self.device.supported_modes if mode in CM_TO_HA_STATE] + [
-            HVACMode.OFF
-        ]
+        return self.capabilities.hvac_modes
 
     @property
     def fan_mode(self) -> str | None:
-        if self.fan_modes:
+        if self.capabilities.fan_modes:
             return CM_TO_HA_FAN_MODE[self.device.fan_mode]
 
         return None
@@ -282,22 +308,36 @@ class CoolmasterClimate(CoordinatorEntity, ClimateEntity):
         using CoolMasterNet configuration commands.
         """
 
-        return [CM_TO_HA_FAN_MODE[mode] for mode in self.device.supported_fan_speeds if mode in CM_TO_HA_FAN_MODE]
+        return self.capabilities.fan_modes
 
     async def async_set_temperature(self, **kwargs):
         """Set new target temperatures."""
         if (temp := kwargs.get(ATTR_TEMPERATURE)) is not None:
             _LOGGER.debug("Setting temp of %s to %s", self.unique_id, str(temp))
-            await self.device.set_temperature(temp, refresh=False)
+            await self.coordinator.async_unit_control(
+                self.device,
+                self.coordinator.commands.async_set_temperature(self.device, temp),
+                target_temperature=Decimal(f"{temp:.1f}"),
+            )
 
     async def async_set_fan_mode(self, fan_mode: str):
         """Set new fan mode."""
         _LOGGER.debug("Setting fan mode of %s to %s", self.unique_id, fan_mode)
-        await self.device.set_fan_mode(HA_FAN_MODE_TO_CM[fan_mode], refresh=False)
+        await self.coordinator.async_unit_control(
+            self.device,
+            self.coordinator.commands.async_set_fan_mode(self.device, HA_FAN_MODE_TO_CM[fan_mode]),
+            fan_mode=HA_FAN_MODE_TO_CM[fan_mode],
+        )
 
     async def async_set_swing_mode(self, swing_mode: str):
         """Set new target swing operation."""
-        await self.device.set_louver_position(HA_SWING_MODE_TO_CM[swing_mode], refresh=False)
+        position = HA_SWING_MODE_TO_CM[swing_mode]
+
+        await self.coordinator.async_unit_control(
+            self.device,
+            self.coordinator.commands.async_set_louver_position(self.device, position),
+            louver_position=constants.LouverPositionState(position.value),
+        )
 
     async def async_set_hvac_mode(self, hvac_mode: HVACMode):
         """Set new operation mode."""
@@ -306,18 +346,29 @@ class CoolmasterClimate(CoordinatorEntity, ClimateEntity):
         if hvac_mode == HVACMode.OFF:
             await self.async_turn_off()
         else:
-            await self.device.set_mode(HA_STATE_TO_CM[hvac_mode], refresh=False)
-            await self.async_turn_on()
+            # queued together, so the mode change and power on go out in the same pipelined batch
+            await asyncio.gather(
+                self.coordinator.async_unit_control(
+                    self.device,
+                    self.coordinator.commands.async_set_mode(self.device, HA_STATE_TO_CM[hvac_mode]),
+                    mode=HA_STATE_TO_CM[hvac_mode],
+                ),
+                self.async_turn_on(),
+            )
 
     async def async_turn_on(self):
         """Turn on."""
         _LOGGER.debug("Turning %s on", self.unique_id)
-        await self.device.set_power_state(True, refresh=False)
+        await self.coordinator.async_unit_control(
+            self.device, self.coordinator.commands.async_set_power_state(self.device, True), power_state=True
+        )
 
     async def async_turn_off(self):
         """Turn off."""
         _LOGGER.debug("Turning %s off", self.unique_id)
-        await self.device.set_power_state(False, refresh=False)
+        await self.coordinator.async_unit_control(
+            self.device, self.coordinator.commands.async_set_power_state(self.device, False), power_state=False
+        )
 
     async def set_ambient_temperature(self, temperature: float):
         """
@@ -328,4 +379,8 @@ class CoolmasterClimate(CoordinatorEntity, ClimateEntity):
         """
         _LOGGER.debug("Sending %d as ambient temperature", temperature)
 
-        await self.device.set_current_temperature(temperature, refresh=False)
+        await self.coordinator.async_unit_control(
+            self.device,
+            self.coordinator.commands.async_set_current_temperature(self.device, temperature),
+            current_temperature=Decimal(f"{temperature:.1f}"),
+        )
@@ -0,0 +1,159 @@
+"""Coalescing command queue for CoolMasterNet unit commands."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from homeassistant.core import HomeAssistant, callback
+from pycoolmasternet_ng import constants, models
+
+from .connection import async_command_many
+from .const import COMMAND_COALESCE_DELAY, COMMAND_COALESCE_MAX_DELAY
+from .priority import PRIORITY_INTERACTIVE, command_priority
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class _PendingCommand:
+    command: str
+    waiters: list[asyncio.Future] = field(default_factory=list)
+
+
+class CommandQueue:
+    """
+    Per-gateway queue for unit commands.
+
+    Commands are held back for a short debounce window. Within that window a newer command for the same unit
+    and attribute replaces the older one (i.e. dragging a temperature slider only sends the final value),
+    then everything left is sent as a single pipelined batch, with interactive priority.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        gateway: models.Gateway,
+        delay: float = COMMAND_COALESCE_DELAY,
+        max_delay: float = COMMAND_COALESCE_MAX_DELAY,
+    ) -> None:
+        self.hass = hass
+        self.gateway = gateway
+        self.delay = delay
+        self.max_delay = max_delay
+
+        # insertion-ordered, so commands for a given unit go out in the order they were first issued
+        self._pending: dict[tuple[str, str], _PendingCommand] = {}
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._flush_deadline: float | None = None
+
+    async def async_unit_command(
+        self, device: models.Device, key: str, command: str, extra_args: list[str] | None = None
+    ) -> None:
+        """
+        Queue a command for a unit and wait until it (or a command superseding it) has been sent.
+
+        :param key: the attribute the command controls, commands with the same key for the same unit supersede
+        each other.
+        """
+        args = [command, str(device.uid)]
+
+        if extra_args:
+            args += extra_args
+
+        await self._async_queue((str(device.uid), key), " ".join(args))
+
+    async def async_gateway_command(self, key: str, command: str) -> None:
+        """
+        Queue a command addressing the gateway as a whole, such as "alloff", and wait until it has been sent.
+        """
+        await self._async_queue(("*", key), command)
+
+    async def _async_queue(self, pending_key: tuple[str, str], command: str) -> None:
+        if (pending := self._pending.get(pending_key)) is not None:
+            _LOGGER.debug("Superseding %r with %r", pending.command, command)
+            pending.command = command
+        else:
+            pending = self._pending[pending_key] = _PendingCommand(command)
+
+        waiter = self.hass.loop.create_future()
+        pending.waiters.append(waiter)
+
+        self._schedule_flush()
+
+        await waiter
+
+    # mirrors of the models.Device setters, going through the queue
+
+    async def async_set_power_state(self, device: models.Device, power_state: bool) -> None:
+        await self.async_unit_command(device, "power", "on" if power_state else "off")
+
+    async def async_set_mode(self, device: models.Device, mode: constants.Mode) -> None:
+        await self.async_unit_command(device, "mode", mode.value.lower())
+
+    async def async_set_temperature(self, device: models.Device, temperature: int | float | Decimal) -> None:
+        await self.async_unit_command(device, "temp", "temp", [f"{temperature:.1f}"])
+
+    async def async_set_fan_mode(self, device: models.Device, fan_speed: constants.FanMode) -> None:
+        await self.async_unit_command(device, "fspeed", "fspeed", [constants.CM_FAN_MODE_FSPEED_ARG_MAP[fan_speed]])
+
+    async def async_set_louver_position(self, device: models.Device, position: constants.LouverPosition) -> None:
+        await self.async_unit_command(device, "swing", "swing", [position.value])
+
+    async def async_reset_filter_sign(self, device: models.Device) -> None:
+        await self.async_unit_command(device, "filt", "filt")
+
+    async def async_set_current_temperature(self, device: models.Device, temperature: int | float | Decimal) -> None:
+        await self.async_unit_command(device, "feed", "feed", [f"{temperature:.1f}"])
+
+    async def async_set_all_power_states(self, power_state: bool) -> None:
+        await self.async_gateway_command("power", "allon" if power_state else "alloff")
+
+    @callback
+    def _schedule_flush(self) -> None:
+        now = self.hass.loop.time()
+
+        if self._flush_deadline is None:
+            self._flush_deadline = now + self.max_delay
+
+        if self._flush_handle:
+            self._flush_handle.cancel()
+
+        self._flush_handle = self.hass.loop.call_at(
+            min(now + self.delay, self._flush_deadline),
+            lambda: self.hass.async_create_task(self._async_flush()),
+        )
+
+    async def _async_flush(self) -> None:
+        # everything queued here was requested by a user or an automation, so it goes ahead of polling
+        command_priority.set(PRIORITY_INTERACTIVE)
+
+        pending = list(self._pending.values())
+
+        self._pending = {}
+        self._flush_handle = None
+        self._flush_deadline = None
+
+        if not pending:
+            return
+
+        try:
+            results = await async_command_many(self.gateway.transport, [p.command for p in pending])
+        except Exception as exc:
+            # not handled here, but handed over to the callers awaiting these commands
+            for p in pending:
+                for waiter in p.waiters:
+                    if not waiter.done():
+                        waiter.set_exception(exc)
+            return
+
+        for p, result in zip(pending, results):
+            for waiter in p.waiters:
+                if waiter.done():
+                    continue
+
+                if isinstance(result, Exception):
+                    waiter.set_exception(result)
+                else:
+                    waiter.set_result(None)
@@ -5,21 +5,46 @@ from typing import Any
 
 import voluptuous as vol
 from homeassistant import core
-from homeassistant.config_entries import ConfigFlow
+from homeassistant.components.sensor import SensorDeviceClass
+from homeassistant.config_entries import ConfigEntry, ConfigFlow, OptionsFlow
 from homeassistant.const import CONF_HOST, CONF_PORT, CONF_PROTOCOL
 from homeassistant.data_entry_flow import FlowResult
-from pycoolmasternet_ng import exceptions, models
+from homeassistant.helpers import selector
+from pycoolmasternet_ng import exceptions
 
-from . import _get_transport_from_config_data
+from . import _get_transport_from_config_data, async_discover_gateway
 from .const import (
+    CONF_AMBIENT_DEADBAND,
+    CONF_AMBIENT_MIN_INTERVAL,
+    CONF_AMBIENT_SENSORS,
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_RECORD_TRAFFIC,
+    CONF_RECORDING_PATH,
+    CONF_REPLAY_REALTIME,
     CONF_SERIAL_BAUD,
+    CONF_SERIAL_NUMBER,
     CONF_SERIAL_URL,
+    CONF_SIMULATOR_ERROR_RATE,
+    CONF_SIMULATOR_LATENCY,
+    CONF_SIMULATOR_UNITS,
+    CONF_STREAMING,
+    DATA_COORDINATOR,
+    DEFAULT_AMBIENT_DEADBAND,
+    DEFAULT_AMBIENT_MIN_INTERVAL,
     DEFAULT_BAUD_RATE,
+    DEFAULT_MAX_SCAN_INTERVAL,
     DEFAULT_PORT,
+    DEFAULT_REST_PORT,
     DOMAIN,
+    PROTOCOL_DISCOVER,
+    PROTOCOL_REPLAY,
+    PROTOCOL_REST,
     PROTOCOL_SERIAL,
+    PROTOCOL_SIMULATOR,
     PROTOCOL_SOCKET,
 )
+from .discovery import DiscoveredGateway, async_get_local_hosts, async_scan
+from .storage import GatewayStore
 
 
 class CoolmasterConfigFlow(ConfigFlow, domain=DOMAIN):
@@ -27,6 +52,14 @@ class CoolmasterConfigFlow(ConfigFlow, domain=DOMAIN):
 
     VERSION = 2
 
+    def __init__(self) -> None:
+        self.discovered: dict[str, DiscoveredGateway] = {}
+
+    @staticmethod
+    @core.callback
+    def async_get_options_flow(config_entry: ConfigEntry) -> OptionsFlow:
+        return CoolmasterOptionsFlow(config_entry)
+
     @core.callback
     def _async_get_entry(self, user_input: dict[str, Any]) -> FlowResult:
         if self.protocol == PROTOCOL_SOCKET:
@@ -34,11 +67,17 @@ class CoolmasterConfigFlow(ConfigFlow, domain=DOMAIN):
 
             if port := user_input.get(CONF_PORT):
                 title += f":{port}"
+        elif self.protocol == PROTOCOL_REST:
+            title = f"REST at {user_input[CONF_HOST]}:{user_input[CONF_PORT]}"
         elif self.protocol == PROTOCOL_SERIAL:
             title = "Serial at " + user_input[CONF_SERIAL_URL]
 
             if baud_rate := user_input.get(CONF_SERIAL_BAUD):
                 title += f" @ {baud_rate} baud"
+        elif self.protocol == PROTOCOL_SIMULATOR:
+            title = f"Simulator with {user_input[CONF_SIMULATOR_UNITS]} units"
+        elif self.protocol == PROTOCOL_REPLAY:
+            title = "Replay of " + user_input[CONF_RECORDING_PATH]
         else:
             raise ValueError(f"Unsupported protocol {self.protocol}")
 
@@ -50,6 +89,9 @@ class CoolmasterConfigFlow(ConfigFlow, domain=DOMAIN):
     async def async_step_user(self, user_input: dict[str, Any] | None = None) -> FlowResult:
         """Handle a flow initialized by the user."""
         if user_input:
+            if user_input[CONF_PROTOCOL] == PROTOCOL_DISCOVER:
+                return await self.async_step_discover()
+
             self.protocol = user_input[CONF_PROTOCOL]
             return await self.async_step_protocol()
 
@@ -57,7 +99,48 @@ class CoolmasterConfigFlow(ConfigFlow, domain=DOMAIN):
             step_id="user",
             data_schema=vol.Schema(
                 {
-                    vol.Required(CONF_PROTOCOL): vol.In([PROTOCOL_SOCKET, PROTOCOL_SERIAL]),
+                    vol.Required(CONF_PROTOCOL, default=PROTOCOL_DISCOVER): vol.In(
+                        [
+                            PROTOCOL_DISCOVER,
+                            PROTOCOL_SOCKET,
+                            PROTOCOL_REST,
+                            PROTOCOL_SERIAL,
+                            PROTOCOL_SIMULATOR,
+                            PROTOCOL_REPLAY,
+                        ]
+                    ),
+                }
+            ),
+        )
+
+    async def async_step_discover(self, user_input: dict[str, Any] | None = None) -> FlowResult:
+        """Pick one of the gateways found on the local network, falling back to a manually entered host."""
+        self.protocol = PROTOCOL_SOCKET
+
+        if user_input:
+            gateway = self.discovered[user_input[CONF_HOST]]
+
+            # set up the same way as a manually entered gateway, see async_step_protocol
+            return await self.async_step_protocol({CONF_HOST: gateway.host, CONF_PORT: gateway.port})
+
+        configured = self._async_current_ids()
+
+        self.discovered = {
+            gateway.host: gateway
+            for gateway in await async_scan(await async_get_local_hosts(self.hass))
+            if gateway.serial_number not in configured
+        }
+
+        if not self.discovered:
+            return await self.async_step_protocol()
+
+        return self.async_show_form(
+            step_id="discover",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_HOST): vol.In(
+                        {host: str(gateway) for host, gateway in sorted(self.discovered.items())}
+                    ),
                 }
             ),
         )
@@ -68,14 +151,23 @@ class CoolmasterConfigFlow(ConfigFlow, domain=DOMAIN):
         if user_input:
             config_data = {CONF_PROTOCOL: self.protocol, **user_input}
 
-            transport = _get_transport_from_config_data(config_data)
+            transport = _get_transport_from_config_data(self.hass, config_data)
 
             try:
-                await models.Gateway.from_transport(transport)
+                gateway, model, mac = await async_discover_gateway(transport)
             except (exceptions.CoolMasterNetRemoteError, OSError):
                 errors["base"] = "cannot_connect"
+            finally:
+                if close := getattr(transport, "async_close", None):
+                    await close()
 
             if not errors:
+                await self.async_set_unique_id(gateway.serial_number)
+                self._abort_if_unique_id_configured()
+
+                # seed the cache so setting up the entry does not have to discover the gateway all over again
+                await GatewayStore(self.hass, gateway.serial_number).async_save_gateway(gateway, model, mac)
+
                 return self._async_get_entry(user_input)
 
         if self.protocol == PROTOCOL_SOCKET:
@@ -85,6 +177,15 @@ class CoolmasterConfigFlow(ConfigFlow, domain=DOMAIN):
                     vol.Required(CONF_PORT, default=DEFAULT_PORT): int,
                 }
             )
+        elif self.protocol == PROTOCOL_REST:
+            schema = vol.Schema(
+                {
+                    vol.Required(CONF_HOST): str,
+                    vol.Required(CONF_PORT, default=DEFAULT_REST_PORT): int,
+                    # the REST API addresses the gateway by its serial number
+                    vol.Required(CONF_SERIAL_NUMBER): str,
+                }
+            )
         elif self.protocol == PROTOCOL_SERIAL:
             schema = vol.Schema(
                 {
@@ -92,6 +193,26 @@ class CoolmasterConfigFlow(ConfigFlow, domain=DOMAIN):
                     vol.Required(CONF_SERIAL_BAUD, default=DEFAULT_BAUD_RATE): int,
                 }
             )
+        elif self.protocol == PROTOCOL_SIMULATOR:
+            schema = vol.Schema(
+                {
+                    vol.Required(CONF_SIMULATOR_UNITS, default=10): vol.All(int, vol.Range(min=1, max=700)),
+                    vol.Optional(CONF_SIMULATOR_LATENCY, default=0.0): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    # 0 means unthrottled
+                    vol.Optional(CONF_SERIAL_BAUD, default=0): vol.All(int, vol.Range(min=0)),
+                    vol.Optional(CONF_SIMULATOR_ERROR_RATE, default=0.0): vol.All(
+                        vol.Coerce(float), vol.Range(min=0, max=1)
+                    ),
+                }
+            )
+        elif self.protocol == PROTOCOL_REPLAY:
+            schema = vol.Schema(
+                {
+                    # a recording made with the "record traffic" option
+                    vol.Required(CONF_RECORDING_PATH): str,
+                    vol.Optional(CONF_REPLAY_REALTIME, default=False): bool,
+                }
+            )
         else:
             raise ValueError(f"Unsupported protocol {self.protocol}")
 
@@ -100,3 +221,78 @@ class CoolmasterConfigFlow(ConfigFlow, domain=DOMAIN):
             data_schema=schema,
             errors=errors,
         )
+
+
+class CoolmasterOptionsFlow(OptionsFlow):
+    """Handle Coolmaster options."""
+
+    def __init__(self, config_entry: ConfigEntry) -> None:
+        self.config_entry = config_entry
+        self.options: dict[str, Any] = {}
+
+    async def async_step_init(self, user_input: dict[str, Any] | None = None) -> FlowResult:
+        if user_input is not None:
+            self.options = {**self.config_entry.options, **user_input}
+            return await self.async_step_ambient_sensors()
+
+        schema: dict[Any, Any] = {
+            vol.Required(
+                CONF_MAX_SCAN_INTERVAL,
+                default=self.config_entry.options.get(CONF_MAX_SCAN_INTERVAL, DEFAULT_MAX_SCAN_INTERVAL),
+            ): vol.All(int, vol.Range(min=60)),
+        }
+
+        # streaming takes a session of its own, which only network gateways can spare
+        if self.config_entry.data.get(CONF_PROTOCOL, PROTOCOL_SOCKET) == PROTOCOL_SOCKET:
+            schema[vol.Required(CONF_STREAMING, default=self.config_entry.options.get(CONF_STREAMING, False))] = bool
+
+        schema.update(
+            {
+                vol.Required(
+                    CONF_AMBIENT_DEADBAND,
+                    default=self.config_entry.options.get(CONF_AMBIENT_DEADBAND, DEFAULT_AMBIENT_DEADBAND),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                vol.Required(
+                    CONF_AMBIENT_MIN_INTERVAL,
+                    default=self.config_entry.options.get(CONF_AMBIENT_MIN_INTERVAL, DEFAULT_AMBIENT_MIN_INTERVAL),
+                ): vol.All(int, vol.Range(min=0)),
+                vol.Required(
+                    CONF_RECORD_TRAFFIC, default=self.config_entry.options.get(CONF_RECORD_TRAFFIC, False)
+                ): bool,
+            }
+        )
+
+        return self.async_show_form(step_id="init", data_schema=vol.Schema(schema))
+
+    async def async_step_ambient_sensors(self, user_input: dict[str, Any] | None = None) -> FlowResult:
+        """Bind temperature sensors to units, to have their measurements fed as the units' ambient temperature."""
+        if (entry_data := self.hass.data.get(DOMAIN, {}).get(self.config_entry.entry_id)) is None:
+            # the units are not known until the entry is set up
+            return self.async_create_entry(title="", data=self.options)
+
+        devices = entry_data[DATA_COORDINATOR].gateway.devices.values()
+
+        if user_input is not None:
+            # fields are labelled with the unit's name, following its UID
+            ambient_sensors = {
+                field.split(maxsplit=1)[0]: entity_id for field, entity_id in user_input.items() if entity_id
+            }
+
+            return self.async_create_entry(title="", data={**self.options, CONF_AMBIENT_SENSORS: ambient_sensors})
+
+        ambient_sensors = self.options.get(CONF_AMBIENT_SENSORS, {})
+
+        return self.async_show_form(
+            step_id="ambient_sensors",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(
+                        f"{device.uid} ({device.friendly_name})" if device.friendly_name else str(device.uid),
+                        description={"suggested_value": ambient_sensors.get(str(device.uid))},
+                    ): selector.EntitySelector(
+                        selector.EntitySelectorConfig(domain="sensor", device_class=SensorDeviceClass.TEMPERATURE)
+                    )
+                    for device in devices
+                }
+            ),
+        )
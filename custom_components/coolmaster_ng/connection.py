@@ -0,0 +1,391 @@
+"""Transports tuned for the way this integration talks to the gateway."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import socket
+import time
+from dataclasses import dataclass
+from typing import TypeVar
+from urllib.parse import quote
+
+import aiohttp
+from pycoolmasternet_ng import exceptions, transports
+from pycoolmasternet_ng.constants import PROMPT
+
+from .const import COMMAND_TIMEOUT, CONNECT_TIMEOUT, KEEPALIVE_INTERVAL
+
+_LOGGER = logging.getLogger(__name__)
+
+T = TypeVar("T", bound=transports.BaseTransport)
+
+MISSING_DATA_MARKER = "...Missing data..."
+
+# commands which leave the gateway in the same state no matter how many times they are executed,
+# and are thus safe to send again if the connection dropped before their response arrived
+REPLAYABLE_COMMANDS = {
+    "ls2",
+    "query",
+    "set",
+    "props",
+    "line",
+    "ifconfig",
+    "on",
+    "off",
+    "cool",
+    "heat",
+    "fan",
+    "dry",
+    "auto",
+    "temp",
+    "fspeed",
+    "swing",
+    "feed",
+    "filt",
+}
+
+
+@dataclass
+class SessionStats:
+    """Counters describing how the persistent session has been used."""
+
+    connections: int = 0
+    reconnects: int = 0
+    replayed_commands: int = 0
+    retried_commands: int = 0
+    commands: int = 0
+    connected_since: float | None = None
+    last_latency: float | None = None
+    max_latency: float = 0.0
+    total_latency: float = 0.0
+
+    @property
+    def connection_lifetime(self) -> float | None:
+        """Seconds the current connection has been open for, None if disconnected."""
+        if self.connected_since is None:
+            return None
+
+        return time.monotonic() - self.connected_since
+
+    @property
+    def average_latency(self) -> float | None:
+        if not self.commands:
+            return None
+
+        return self.total_latency / self.commands
+
+    def as_dict(self) -> dict:
+        return {
+            "connections": self.connections,
+            "reconnects": self.reconnects,
+            "replayed_commands": self.replayed_commands,
+            "retried_commands": self.retried_commands,
+            "commands": self.commands,
+            "connection_lifetime": self.connection_lifetime,
+            "last_latency": self.last_latency,
+            "average_latency": self.average_latency,
+            "max_latency": self.max_latency,
+        }
+
+
+class PersistentTCPTransport(transports.TCPTransport):
+    """
+    A TCP transport keeping a single long-lived session open to the gateway.
+
+    The library's TCPTransport opens a new connection for every command; this one reuses the connection,
+    probes it with an empty line when idle to detect half-open sessions early, and transparently reconnects
+    when it drops - replaying the unanswered commands if they are safe to repeat.
+
+    Several commands can be sent without waiting for each response. The gateway processes commands in order,
+    so the responses can be read back in the same order and a batch costs roughly one round trip.
+    """
+
+    def __init__(self, host: str, port: int | str = 10102, keepalive_interval: float = KEEPALIVE_INTERVAL):
+        super().__init__(host, port=port)
+
+        self.keepalive_interval = keepalive_interval
+        self.stats = SessionStats()
+
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._lock = asyncio.Lock()
+        self._last_used = 0.0
+        self._keepalive_task: asyncio.Task | None = None
+
+    async def command(self, command: str) -> list[str]:
+        result = (await self.command_many([command]))[0]
+
+        if isinstance(result, Exception):
+            raise result
+
+        return result
+
+    async def command_many(self, commands: list[str]) -> list[list[str] | Exception]:
+        """
+        Send all commands back-to-back and return their results in order.
+
+        Commands rejected by the gateway have their exception returned in place of the result,
+        so one bad command does not lose the outcome of the others. Connection errors are raised for the whole batch.
+        """
+        if not commands:
+            return []
+
+        async with self._lock:
+            results = await self._async_exchange(commands)
+
+        # see TCPTransport.command - the gateway sometimes garbles a response, in which case we ask again
+        for index, result in enumerate(results):
+            while result is None:
+                self.stats.retried_commands += 1
+                await asyncio.sleep(1)
+
+                async with self._lock:
+                    result = results[index] = (await self._async_exchange([commands[index]]))[0]
+
+        return results
+
+    async def _async_exchange(self, commands: list[str]) -> list[list[str] | Exception | None]:
+        results: list[list[str] | Exception | None] = []
+        replayed = False
+
+        while True:
+            remaining = commands[len(results) :]
+
+            try:
+                await self._async_send_receive(remaining, results)
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError) as exc:
+                await self._async_disconnect()
+
+                if replayed or not all(command.split(maxsplit=1)[0] in REPLAYABLE_COMMANDS for command in remaining):
+                    raise ConnectionError(f"Connection to {self} lost: {exc!r}") from exc
+
+                _LOGGER.debug("Connection to %s lost, replaying %d commands", self, len(remaining))
+                self.stats.reconnects += 1
+                self.stats.replayed_commands += len(remaining)
+                replayed = True
+            except BaseException:
+                # cancelled halfway through, e.g. by a poll timing out: the responses still on their way
+                # would be read as those of the next commands, so the session has to go
+                self._disconnect()
+                raise
+            else:
+                return results
+
+    async def _async_send_receive(self, commands: list[str], results: list[list[str] | Exception | None]) -> None:
+        """
+        Send the commands and append their results as they arrive, so the caller knows which ones were answered
+        if the connection drops halfway through.
+        """
+        reader, writer = await self._async_connect()
+
+        started = time.monotonic()
+        writer.write("".join(command + "\n" for command in commands).encode("utf-8"))
+
+        for command in commands:
+            response_bytes = await asyncio.wait_for(reader.readuntil(b"\r\n" + PROMPT), COMMAND_TIMEOUT)
+            response = response_bytes.decode("utf-8")
+
+            self._record_latency(time.monotonic() - started)
+            started = time.monotonic()
+
+            if MISSING_DATA_MARKER in response:
+                _LOGGER.warning("Got missing data, retrying - command %s, response %s", command, response)
+                results.append(None)
+                continue
+
+            try:
+                results.append(self._parse_response(response.split("\r\n")[:-1]))
+            except exceptions.CoolMasterNetRemoteError as exc:
+                results.append(exc)
+
+        self._last_used = time.monotonic()
+
+    def _record_latency(self, latency: float) -> None:
+        self.stats.commands += 1
+        self.stats.last_latency = latency
+        self.stats.total_latency += latency
+        self.stats.max_latency = max(self.stats.max_latency, latency)
+
+    async def _async_connect(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        if self._writer is not None and not self._writer.is_closing():
+            return self._reader, self._writer
+
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), CONNECT_TIMEOUT)
+
+        try:
+            await asyncio.wait_for(reader.readuntil(PROMPT), CONNECT_TIMEOUT)
+        except BaseException:
+            writer.close()
+            raise
+
+        if sock := writer.get_extra_info("socket"):
+            # let the OS notice a silently dropped connection too, not just our own keep-alive
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+
+            if hasattr(socket, "TCP_KEEPIDLE"):
+                keepalive_interval = max(int(self.keepalive_interval), 1)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, keepalive_interval)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, keepalive_interval)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3)
+
+        self._reader, self._writer = reader, writer
+        self._last_used = time.monotonic()
+
+        self.stats.connections += 1
+        self.stats.connected_since = time.monotonic()
+
+        if self._keepalive_task is None or self._keepalive_task.done():
+            self._keepalive_task = asyncio.create_task(self._async_keepalive())
+
+        _LOGGER.debug("Connected to %s", self)
+
+        return reader, writer
+
+    async def _async_disconnect(self) -> None:
+        if (writer := self._disconnect()) is not None:
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    def _disconnect(self) -> asyncio.StreamWriter | None:
+        """Close the connection without waiting for it to be closed, returning its writer if there was one."""
+        writer, self._reader, self._writer = self._writer, None, None
+        self.stats.connected_since = None
+
+        if writer is not None:
+            writer.close()
+
+        return writer
+
+    async def _async_keepalive(self) -> None:
+        """
+        Probe the session when idle, so a half-open connection is noticed before a real command needs it.
+        """
+        while self._writer is not None:
+            await asyncio.sleep(self.keepalive_interval)
+
+            if self._lock.locked() or time.monotonic() - self._last_used < self.keepalive_interval:
+                continue
+
+            async with self._lock:
+                if self._writer is None:
+                    break
+
+                try:
+                    self._writer.write(b"\n")
+                    await asyncio.wait_for(self._reader.readuntil(PROMPT), COMMAND_TIMEOUT)
+                except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    _LOGGER.debug("Keep-alive to %s failed, dropping the connection", self)
+                    await self._async_disconnect()
+                except BaseException:
+                    # same as an exchange cancelled halfway through
+                    self._disconnect()
+                    raise
+                else:
+                    self._last_used = time.monotonic()
+
+    async def async_close(self) -> None:
+        """Close the session and stop the keep-alive."""
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            self._keepalive_task = None
+
+        async with self._lock:
+            await self._async_disconnect()
+
+
+class HTTPTransport(transports.NetworkTransportMixin, transports.CharTransportBase):
+    """
+    A transport for the gateway's REST API, sending the same commands as over TCP through its "raw" endpoint.
+
+    Requests go through the given aiohttp session, whose connection pool keeps connections to the gateway alive
+    between requests. Unlike the single TCP session, this does not compete with other clients such as the vendor app.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, host: str, port: int | str, serial_number: str):
+        self.session = session
+        self.host = host
+        self.port = port
+        self.serial_number = serial_number
+
+        self._url = f"http://{host}:{port}/v1.0/device/{quote(serial_number)}/raw"
+        self._timeout = aiohttp.ClientTimeout(total=COMMAND_TIMEOUT, connect=CONNECT_TIMEOUT)
+
+    async def command(self, command: str) -> list[str]:
+        try:
+            async with self.session.get(self._url, params={"command": command}, timeout=self._timeout) as response:
+                response.raise_for_status()
+                payload = await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as exc:
+            raise ConnectionError(f"Request to {self} failed: {exc!r}") from exc
+
+        # the result code takes the place of the final line of a TCP response
+        return self._parse_response([*payload.get("data", []), payload["rc"]])
+
+    def __str__(self):
+        return f"REST {self.host}:{self.port}"
+
+
+class TransportWrapper(transports.CharTransportBase):
+    """
+    Base class for transports adding behaviour around another transport, e.g. instrumentation.
+
+    Anything not overridden is delegated to the wrapped transport.
+    """
+
+    def __init__(self, transport: transports.BaseTransport):
+        self.transport = transport
+
+    async def command(self, command: str) -> list[str]:
+        return await self.transport.command(command)
+
+    async def command_many(self, commands: list[str]) -> list[list[str] | Exception]:
+        return await async_command_many(self.transport, commands)
+
+    def __getattr__(self, name: str):
+        if name == "transport":
+            raise AttributeError(name)
+
+        return getattr(self.transport, name)
+
+    def __str__(self):
+        return str(self.transport)
+
+
+def unwrap_transport(transport: transports.BaseTransport) -> transports.BaseTransport:
+    """Return the innermost transport, the one actually talking to the gateway."""
+    while isinstance(transport, TransportWrapper):
+        transport = transport.transport
+
+    return transport
+
+
+def find_transport(transport: transports.BaseTransport, cls: type[T]) -> T | None:
+    """Return the transport of the given class among the given one and the ones it wraps, if any."""
+    while True:
+        if isinstance(transport, cls):
+            return transport
+
+        if not isinstance(transport, TransportWrapper):
+            return None
+
+        transport = transport.transport
+
+
+async def async_command_many(transport: transports.BaseTransport, commands: list[str]) -> list[list[str] | Exception]:
+    """
+    Send a batch of commands, pipelined if the transport supports it and sequentially otherwise.
+    """
+    if command_many := getattr(transport, "command_many", None):
+        return await command_many(commands)
+
+    results: list[list[str] | Exception] = []
+
+    for command in commands:
+        try:
+            results.append(await transport.command(command))
+        except exceptions.CoolMasterNetRemoteError as exc:
+            results.append(exc)
+
+    return results
@@ -1,17 +1,113 @@
 """Constants for the Coolmaster integration."""
+from datetime import timedelta
 
 DATA_INFO = "info"
 DATA_COORDINATOR = "coordinator"
+DATA_SCHEDULER = "scheduler"
 
 DOMAIN = "coolmaster_ng"
 
 CONF_SERIAL_URL = "serial_url"
 CONF_SERIAL_BAUD = "device_baudrate"
+CONF_SERIAL_NUMBER = "serial_number"
+CONF_MAX_SCAN_INTERVAL = "max_scan_interval"
+CONF_STREAMING = "streaming"
+CONF_RECORD_TRAFFIC = "record_traffic"
+CONF_RECORDING_PATH = "recording_path"
+CONF_REPLAY_REALTIME = "replay_realtime"
+CONF_AMBIENT_SENSORS = "ambient_sensors"
+CONF_AMBIENT_DEADBAND = "ambient_deadband"
+CONF_AMBIENT_MIN_INTERVAL = "ambient_min_interval"
+CONF_SIMULATOR_UNITS = "simulator_units"
+CONF_SIMULATOR_LATENCY = "simulator_latency"
+CONF_SIMULATOR_ERROR_RATE = "simulator_error_rate"
 
 DEFAULT_PORT = 10102
+DEFAULT_REST_PORT = 10103
 DEFAULT_BAUD_RATE = 9600
+DEFAULT_MAX_SCAN_INTERVAL = 300
+DEFAULT_AMBIENT_DEADBAND = 0.5
+DEFAULT_AMBIENT_MIN_INTERVAL = 60
+
+# poll quickly for a while after a user command so the new state is confirmed promptly
+FAST_SCAN_INTERVAL = timedelta(seconds=5)
+FAST_SCAN_WINDOW = timedelta(seconds=60)
+
+# seconds to hold back unit commands so rapid changes to the same attribute can be coalesced
+COMMAND_COALESCE_DELAY = 0.3
+COMMAND_COALESCE_MAX_DELAY = 1.0
+
+# seconds
+CONNECT_TIMEOUT = 10
+COMMAND_TIMEOUT = 10
+KEEPALIVE_INTERVAL = 30
+
+# seconds
+GATEWAY_CACHE_SAVE_DELAY = 300
+GATEWAY_RECONCILE_RETRY_INTERVAL = 60
+
+# seconds to wait after a command before refreshing the unit to confirm its optimistic state
+DEVICE_REFRESH_COOLDOWN = 2.0
+
+# seconds between status listings when streaming, and before reconnecting a dropped stream
+STREAM_INTERVAL = 1.0
+STREAM_RETRY_INTERVAL = 30
+
+# seconds to collect ambient temperature changes for, so changes of several sensors are fed in one batch
+AMBIENT_FEED_BATCH_DELAY = 1.0
+
+# seconds a host has to answer when scanning the network for gateways, how many hosts are probed at once,
+# and the largest network scanned (as a prefix length)
+DISCOVERY_TIMEOUT = 1.0
+DISCOVERY_MAX_CONCURRENT = 64
+DISCOVERY_MIN_PREFIX = 24
+
+# exchanges kept in the wire trace, see WireTrace
+WIRE_TRACE_SIZE = 200
+
+# exchanges buffered before a traffic recording is written out, or seconds at most they are buffered for
+RECORDING_FLUSH_SIZE = 100
+RECORDING_FLUSH_INTERVAL = 30
+
+# consecutive connection failures after which a gateway is considered unreachable,
+# and seconds between probes for its recovery, doubling after each failed probe
+CIRCUIT_FAILURE_THRESHOLD = 3
+CIRCUIT_PROBE_INTERVAL = 5
+CIRCUIT_PROBE_MAX_INTERVAL = 300
+
+# consecutive status listings a unit has to be missing from to be considered removed from the gateway
+UNIT_REMOVAL_LISTINGS = 3
+
+# seconds between refreshes of what rarely changes - the units' properties, HVAC lines and louver positions
+STATIC_REFRESH_INTERVAL = 600
+
+# polls allowed to run at the same time across all gateways
+MAX_CONCURRENT_POLLS = 2
+
+# seconds a poll may hold its slot for, so a hung gateway does not hold up the others
+POLL_TIMEOUT = 60
+
+# seconds before retrying a unit which failed to refresh, doubling after each failed retry
+UNIT_RETRY_INTERVAL = 10
+UNIT_RETRY_MAX_INTERVAL = 600
+
+# seconds the duty cycles are averaged over
+RUNTIME_DUTY_CYCLE_WINDOW = 24 * 60 * 60
+# seconds between updates longer than which are not accounted for, raised to twice the max poll interval if need be
+RUNTIME_MAX_GAP = 15 * 60
+RUNTIME_SAVE_DELAY = 300
 
 PROTOCOL_SERIAL = "serial"
 PROTOCOL_SOCKET = "socket"
+PROTOCOL_REST = "rest"
+PROTOCOL_SIMULATOR = "simulator"
+PROTOCOL_REPLAY = "replay"
+# not a protocol as such, but a TCP gateway picked from those found on the network
+PROTOCOL_DISCOVER = "discover"
+
+# dispatched with the devices of units added to a gateway, formatted with the config entry ID
+SIGNAL_UNITS_ADDED = "coolmaster_ng_units_added_{}"
 
 SERVICE_SET_AMBIENT_TEMPERATURE = "set_ambient_temperature"
+SERVICE_BULK_SET_HVAC_MODE = "bulk_set_hvac_mode"
+SERVICE_DUMP_WIRE_TRACE = "dump_wire_trace"
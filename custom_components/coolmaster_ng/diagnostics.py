@@ -0,0 +1,80 @@
+"""Diagnostics support for Coolmaster."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import REDACTED, async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST
+from homeassistant.core import HomeAssistant
+
+from . import CoolmasterDataUpdateCoordinator
+from .connection import find_transport, unwrap_transport
+from .const import CONF_SERIAL_URL, DATA_COORDINATOR, DOMAIN
+from .priority import PriorityTransport
+from .supervisor import CircuitBreakerTransport
+
+TO_REDACT = {CONF_HOST, CONF_SERIAL_URL}
+
+# commands whose responses give away the gateway's network identity, its IP and MAC addresses
+TRACE_COMMANDS_TO_REDACT = {"ifconfig"}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator: CoolmasterDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id][DATA_COORDINATOR]
+    transport = coordinator.gateway.transport
+    session_stats = getattr(unwrap_transport(transport), "stats", None)
+
+    return {
+        "entry": {
+            "data": async_redact_data(entry.data, TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "gateway": {
+            "model": coordinator.model,
+            "version": coordinator.gateway.version,
+            "units": len(coordinator.gateway.devices),
+        },
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "update_interval": coordinator.update_interval.total_seconds(),
+            "bulk_poll": coordinator.bulk_poll,
+            "skipped_state_writes": coordinator.skipped_state_writes,
+            "unit_failures": dict(coordinator.unit_failures),
+            "poll_phase": coordinator.scheduler.phase(coordinator.gateway.serial_number),
+            "gateways_scheduled": coordinator.scheduler.gateways,
+        },
+        "stream": {"connected": stream.connected, "listings": stream.listings}
+        if (stream := coordinator.stream)
+        else None,
+        "polls": coordinator.poll_telemetry.as_dict(),
+        "transport": telemetry.as_dict() if (telemetry := getattr(transport, "telemetry", None)) else None,
+        "session": session_stats.as_dict() if session_stats else None,
+        "priority": transport.as_dict() if isinstance(transport, PriorityTransport) else None,
+        "circuit": breaker.as_dict() if (breaker := find_transport(transport, CircuitBreakerTransport)) else None,
+        "trace": _redact_trace(trace.as_list(), entry) if (trace := getattr(transport, "trace", None)) else None,
+    }
+
+
+def _redact_trace(exchanges: list[dict[str, Any]], entry: ConfigEntry) -> list[dict[str, Any]]:
+    """
+    Redact the responses of TRACE_COMMANDS_TO_REDACT, and the gateway's address from errors
+    (connection errors name the address they failed to connect to).
+    """
+    addresses = [address for key in TO_REDACT if (address := entry.data.get(key))]
+    redacted = []
+
+    for exchange in exchanges:
+        exchange = dict(exchange)
+
+        if "response" in exchange and exchange["command"].partition(" ")[0] in TRACE_COMMANDS_TO_REDACT:
+            exchange["response"] = REDACTED
+
+        if "error" in exchange:
+            for address in addresses:
+                exchange["error"] = exchange["error"].replace(str(address), REDACTED)
+
+        redacted.append(exchange)
+
+    return redacted
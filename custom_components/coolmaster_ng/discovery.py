@@ -0,0 +1,137 @@
+"""Finding gateways on the local network."""
+from __future__ import annotations
+
+import asyncio
+import ipaddress
+import logging
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from homeassistant.components import network
+from homeassistant.core import HomeAssistant
+from pycoolmasternet_ng import exceptions, models, transports
+from pycoolmasternet_ng.constants import PROMPT
+
+from .const import DEFAULT_PORT, DISCOVERY_MAX_CONCURRENT, DISCOVERY_MIN_PREFIX, DISCOVERY_TIMEOUT
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DiscoveredGateway:
+    host: str
+    port: int
+    serial_number: str
+    # None if it can not be told from the serial number alone
+    model: str | None
+    version: str | None
+
+    def __str__(self):
+        return f"{self.model or 'Gateway'} {self.serial_number} at {self.host}:{self.port}"
+
+
+def gateway_model_from_serial_number(serial_number: str) -> str | None:
+    # according to CoolAutomation, CoolMasterNet S/Ns begin with 283B960,
+    # CoolLinkHub's begin with 283B96C
+    if serial_number.startswith("283B960"):
+        return "CoolMasterNet"
+
+    if serial_number.startswith("283B96C"):
+        return "CoolLinkHub"
+
+    return None
+
+
+async def async_get_local_hosts(hass: HomeAssistant) -> list[str]:
+    """
+    Return the addresses of the IPv4 networks Home Assistant is connected to, excluding its own.
+
+    Networks larger than DISCOVERY_MIN_PREFIX are narrowed down to that prefix around Home Assistant's address,
+    so a scan stays within a few seconds.
+    """
+    hosts: dict[str, None] = {}
+
+    for adapter in await network.async_get_adapters(hass):
+        if not adapter["enabled"]:
+            continue
+
+        for ipv4 in adapter["ipv4"]:
+            address = ipaddress.IPv4Address(ipv4["address"])
+
+            if address.is_loopback or address.is_link_local:
+                continue
+
+            prefix = max(ipv4["network_prefix"], DISCOVERY_MIN_PREFIX)
+
+            for host in ipaddress.IPv4Network(f"{address}/{prefix}", strict=False).hosts():
+                if host != address:
+                    hosts[str(host)] = None
+
+    return list(hosts)
+
+
+async def async_probe_host(host: str, port: int = DEFAULT_PORT) -> DiscoveredGateway | None:
+    """
+    Return the gateway listening at the given address, or None if there isn't one answering within DISCOVERY_TIMEOUT.
+    """
+    try:
+        settings = await asyncio.wait_for(_async_get_settings(host, port), DISCOVERY_TIMEOUT)
+    except (
+        OSError,
+        asyncio.TimeoutError,
+        # something else listening on the port, closing the connection or rambling on without a prompt
+        asyncio.IncompleteReadError,
+        asyncio.LimitOverrunError,
+        UnicodeDecodeError,
+        ValueError,
+        exceptions.CoolMasterNetRemoteError,
+    ):
+        return None
+
+    if not (serial_number := settings.get("S/N")):
+        return None
+
+    return DiscoveredGateway(
+        host=host,
+        port=port,
+        serial_number=serial_number,
+        model=gateway_model_from_serial_number(serial_number),
+        version=settings.get("Version"),
+    )
+
+
+async def async_scan(hosts: Iterable[str], port: int = DEFAULT_PORT) -> list[DiscoveredGateway]:
+    """
+    Probe all the given hosts for gateways, DISCOVERY_MAX_CONCURRENT at a time.
+
+    Addresses nobody answers at cost DISCOVERY_TIMEOUT, so a /24 takes a few seconds at worst.
+    """
+    semaphore = asyncio.Semaphore(DISCOVERY_MAX_CONCURRENT)
+
+    async def _async_probe(host: str) -> DiscoveredGateway | None:
+        async with semaphore:
+            return await async_probe_host(host, port)
+
+    gateways = [gateway for gateway in await asyncio.gather(*(_async_probe(host) for host in hosts)) if gateway]
+
+    _LOGGER.debug("Found gateways: %s", ", ".join(map(str, gateways)) or "none")
+
+    return gateways
+
+
+async def _async_get_settings(host: str, port: int) -> dict[str, str]:
+    """
+    The "set" command over a bare connection - the regular transports are tuned for a gateway known to be there,
+    not for quickly telling whether there is one at all.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+
+    try:
+        await reader.readuntil(PROMPT)
+
+        writer.write(b"set\n")
+        response = (await reader.readuntil(b"\r\n" + PROMPT)).decode("utf-8")
+    finally:
+        writer.close()
+
+    return models.Gateway._parse_key_values(transports.CharTransportBase._parse_response(response.split("\r\n")[:-1]))
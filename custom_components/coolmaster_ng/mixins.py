@@ -1,12 +1,16 @@
 from __future__ import annotations
 
+from functools import cached_property
+
 from homeassistant.helpers.entity import DeviceInfo
 
 from .const import DOMAIN
 
 
 class UtilityEntityMixin:
-    @property
+    # neither of these can change for a given device, so they are only computed once
+
+    @cached_property
     def device_info(self) -> DeviceInfo:
         return DeviceInfo(
             identifiers={(DOMAIN, str(self.device.uid))},
@@ -14,10 +18,15 @@ class UtilityEntityMixin:
             via_device=(DOMAIN, self.device.gateway.serial_number),
         )
 
-    @property
+    @cached_property
     def unique_id(self) -> str:
         return str(self.device.uid) + "-" + self.title.lower().replace(" ", "_")
 
+    @property
+    def available(self) -> bool:
+        # units failing to refresh are unavailable on their own, see CoolmasterDataUpdateCoordinator
+        return super().available and self.coordinator.is_unit_available(self.device)
+
     @property
     def name(self) -> str:
         device_name = self.device.friendly_name or str(self.device.uid)
@@ -0,0 +1,98 @@
+"""Prioritised access to the gateway, so user commands do not wait behind background polling."""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+from pycoolmasternet_ng import transports
+
+from .connection import TransportWrapper, async_command_many
+from .telemetry import LatencyHistogram
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_BACKGROUND: "background",
+}
+
+# priority of the commands sent from the current task, anything not explicitly interactive is background work
+command_priority: ContextVar[int] = ContextVar("command_priority", default=PRIORITY_BACKGROUND)
+
+
+class PriorityTransport(TransportWrapper):
+    """
+    Lets one command (or pipelined batch) at a time through to the wrapped transport, highest priority first.
+
+    The priority is taken from command_priority, set by whoever sends commands on behalf of the user.
+    A poll sends one command per unit at most, so user commands get through between two units of a poll
+    rather than after all of them. The time spent waiting for the transport is recorded per priority class.
+    """
+
+    def __init__(self, transport: transports.BaseTransport):
+        super().__init__(transport)
+
+        self.wait_times = {name: LatencyHistogram() for name in PRIORITY_NAMES.values()}
+
+        self._busy = False
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    async def command(self, command: str) -> list[str]:
+        async with self._async_acquire():
+            return await self.transport.command(command)
+
+    async def command_many(self, commands: list[str]) -> list[list[str] | Exception]:
+        async with self._async_acquire():
+            return await async_command_many(self.transport, commands)
+
+    @asynccontextmanager
+    async def _async_acquire(self) -> AsyncIterator[None]:
+        priority = command_priority.get()
+        started = time.monotonic()
+
+        if self._busy:
+            waiter = asyncio.get_running_loop().create_future()
+            # ties are broken by arrival, so each class is served in order
+            heapq.heappush(self._waiters, (priority, next(self._sequence), waiter))
+
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # the transport was handed over just as we got cancelled, pass it on
+                    self._release()
+
+                raise
+        else:
+            self._busy = True
+
+        self.wait_times[PRIORITY_NAMES[priority]].record(time.monotonic() - started)
+
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+
+            if not waiter.done():
+                # hand the transport over directly, so nobody can sneak in ahead of the next in line
+                waiter.set_result(None)
+                return
+
+        self._busy = False
+
+    def as_dict(self) -> dict:
+        return {
+            "waiting": sum(1 for _, _, waiter in self._waiters if not waiter.done()),
+            "wait_times": {name: histogram.as_dict() for name, histogram in self.wait_times.items()},
+        }
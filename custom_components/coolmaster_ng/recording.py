@@ -0,0 +1,246 @@
+"""Recording the traffic with a gateway, and replaying it in place of the gateway."""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from typing import Any
+
+from pycoolmasternet_ng import exceptions, transports
+
+from .connection import TransportWrapper, async_command_many, unwrap_transport
+from .const import RECORDING_FLUSH_INTERVAL, RECORDING_FLUSH_SIZE
+
+_LOGGER = logging.getLogger(__name__)
+
+RECORDING_VERSION = 1
+
+# what took the place of a response, see RecordingTransport
+ERROR_TIMEOUT = "timeout"
+ERROR_CONNECTION = "connection"
+ERROR_REMOTE = "remote"
+
+
+class RecordingTransport(TransportWrapper):
+    """
+    Records every exchange with the wrapped transport to a file, one compact JSON object per line.
+
+    The first line describes the recording, every following one an exchange:
+
+    * "t" - seconds since the recording started, "d" - seconds it took
+    * "c" - the command
+    * "r" - the response lines and "s" - the result line ("OK" or "ERROR:<code>"), as they would come over TCP
+    * or "e" - "timeout", "connection" or "remote" instead, if there was no usable response
+
+    Lines are written outside of the event loop, in batches of RECORDING_FLUSH_SIZE or whatever is pending
+    after RECORDING_FLUSH_INTERVAL, whichever comes first, and whatever remains on close or async_flush.
+    """
+
+    def __init__(self, transport: transports.BaseTransport, path: str):
+        super().__init__(transport)
+
+        self.path = path
+
+        self._started = time.monotonic()
+        self._pending: list[str] = []
+        self._flush_task: asyncio.Task | None = None
+        self._flush_timer: asyncio.TimerHandle | None = None
+
+        self._append(
+            {
+                "v": RECORDING_VERSION,
+                "transport": str(transport),
+                "network": isinstance(unwrap_transport(transport), transports.NetworkTransportMixin),
+                "started": time.time(),
+            }
+        )
+
+    async def command(self, command: str) -> list[str]:
+        started = time.monotonic()
+
+        try:
+            result = await self.transport.command(command)
+        except (OSError, asyncio.TimeoutError, exceptions.CoolMasterNetRemoteError) as exc:
+            self._record(command, started, exc)
+            raise
+
+        self._record(command, started, result)
+
+        return result
+
+    async def command_many(self, commands: list[str]) -> list[list[str] | Exception]:
+        started = time.monotonic()
+
+        try:
+            results = await async_command_many(self.transport, commands)
+        except (OSError, asyncio.TimeoutError) as exc:
+            for command in commands:
+                self._record(command, started, exc)
+
+            raise
+
+        # the batch took one round trip, so they all share its duration
+        for command, result in zip(commands, results):
+            self._record(command, started, result)
+
+        return results
+
+    async def async_flush(self, *_) -> None:
+        """Write out everything recorded so far, e.g. when Home Assistant stops without unloading the entry."""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+        if self._flush_task is not None:
+            await self._flush_task
+
+        await self._async_flush()
+
+    async def async_close(self) -> None:
+        await self.async_flush()
+
+        if close := getattr(self.transport, "async_close", None):
+            await close()
+
+    def _record(self, command: str, started: float, result: list[str] | Exception) -> None:
+        exchange: dict[str, Any] = {
+            "t": round(started - self._started, 4),
+            "d": round(time.monotonic() - started, 4),
+            "c": command,
+        }
+
+        if isinstance(result, asyncio.TimeoutError):
+            exchange["e"] = ERROR_TIMEOUT
+        elif isinstance(result, OSError):
+            exchange["e"] = ERROR_CONNECTION
+        elif isinstance(result, exceptions.CoolMasterNetRemoteError):
+            if code := getattr(result, "code", None):
+                exchange["r"], exchange["s"] = [], f"ERROR:{code}"
+            else:
+                exchange["e"] = ERROR_REMOTE
+        else:
+            exchange["r"], exchange["s"] = result, "OK"
+
+        self._append(exchange)
+
+        if len(self._pending) >= RECORDING_FLUSH_SIZE:
+            self._start_flush()
+        elif self._flush_timer is None:
+            self._flush_timer = asyncio.get_running_loop().call_later(RECORDING_FLUSH_INTERVAL, self._start_flush)
+
+    def _start_flush(self) -> None:
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._async_flush())
+
+    def _append(self, data: dict[str, Any]) -> None:
+        self._pending.append(json.dumps(data, separators=(",", ":")))
+
+    async def _async_flush(self) -> None:
+        # a single flush at a time, so lines are written in order
+        while self._pending:
+            lines, self._pending = self._pending, []
+
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self._write, lines)
+            except OSError as exc:
+                _LOGGER.warning("Failed to write traffic recording to %s: %r", self.path, exc)
+
+    def _write(self, lines: list[str]) -> None:
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+
+
+class ReplayTransport(transports.CharTransportBase):
+    """
+    Plays back a recording made by RecordingTransport in place of the gateway.
+
+    Each command is answered with the next recorded response to that same command, so the order commands are sent
+    in does not have to match the recording exactly. Once a command's responses run out, the last one is repeated,
+    as if the gateway had not changed since. Commands which were never recorded are rejected as unknown.
+
+    Responses come back as fast as possible, or with the original timing if realtime is set: no sooner than
+    they originally did counting from the first command, and after at least as long as they originally took.
+    """
+
+    def __init__(self, path: str, realtime: bool = False):
+        self.path = path
+        self.realtime = realtime
+
+        self._exchanges: dict[str, deque[dict[str, Any]]] | None = None
+        self._load_lock = asyncio.Lock()
+        # offset of the first recorded exchange, and monotonic time the first command was replayed at
+        self._recording_started = 0.0
+        self._replay_started: float | None = None
+
+    async def command(self, command: str) -> list[str]:
+        exchanges = await self._async_get_exchanges()
+
+        if self._replay_started is None:
+            self._replay_started = time.monotonic()
+
+        if not (queue := exchanges.get(command)):
+            raise exceptions.CoolMasterNetUnknownCommandError()
+
+        exchange = queue.popleft() if len(queue) > 1 else queue[0]
+
+        await asyncio.sleep(self._get_delay(exchange) if self.realtime else 0)
+
+        if (error := exchange.get("e")) == ERROR_TIMEOUT:
+            raise asyncio.TimeoutError()
+
+        if error == ERROR_CONNECTION:
+            raise ConnectionError(f"Connection error recorded in {self.path}")
+
+        if error == ERROR_REMOTE:
+            raise exceptions.CoolMasterNetUnknownError(f"Remote error recorded in {self.path}")
+
+        # goes through the same parsing as a live response
+        return self._parse_response([*exchange["r"], exchange["s"]])
+
+    def _get_delay(self, exchange: dict[str, Any]) -> float:
+        # the gaps between commands were recorded too, a response repeated since is only delayed by its duration
+        due = self._replay_started + exchange["t"] - self._recording_started + exchange["d"]
+
+        return max(exchange["d"], due - time.monotonic())
+
+    async def _async_get_exchanges(self) -> dict[str, deque[dict[str, Any]]]:
+        async with self._load_lock:
+            if self._exchanges is None:
+                try:
+                    self._exchanges = await asyncio.get_running_loop().run_in_executor(None, self._load)
+                except ValueError as exc:
+                    # reported the same way as a gateway which can not be reached
+                    raise OSError(f"Invalid recording {self.path}: {exc}") from exc
+
+        return self._exchanges
+
+    def _load(self) -> dict[str, deque[dict[str, Any]]]:
+        exchanges: dict[str, deque[dict[str, Any]]] = {}
+        started = None
+
+        with open(self.path, encoding="utf-8") as file:
+            header = json.loads(file.readline())
+
+            if header.get("v") != RECORDING_VERSION:
+                raise ValueError(f"Unsupported recording version {header.get('v')}")
+
+            for line in file:
+                if line.strip():
+                    exchange = json.loads(line)
+                    exchanges.setdefault(exchange["c"], deque()).append(exchange)
+
+                    # lines are in the order exchanges completed in, not started in
+                    started = exchange["t"] if started is None else min(started, exchange["t"])
+
+        self._recording_started = started or 0.0
+
+        return exchanges
+
+    def __str__(self):
+        return f"Replay of {self.path}"
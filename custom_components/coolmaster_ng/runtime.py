@@ -0,0 +1,160 @@
+"""Runtime and duty cycle statistics, accumulated as the units are polled."""
+from __future__ import annotations
+
+import math
+import time
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from homeassistant.components.climate.const import HVACAction
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from pycoolmasternet_ng import constants, models
+
+from .const import DOMAIN, RUNTIME_DUTY_CYCLE_WINDOW, RUNTIME_MAX_GAP, RUNTIME_SAVE_DELAY
+
+STORAGE_VERSION = 1
+
+
+def device_hvac_action(device: models.Device) -> HVACAction:
+    """
+    Return the current "action" (whether the unit is currently heating/cooling/etc).
+
+    We use a combination of the "demand" flag as well as comparing current & target temperatures
+    to account for cases where the demand flag is always set to False.
+    """
+    if not device.power_state:
+        return HVACAction.OFF
+
+    if device.mode == constants.Mode.FAN:
+        return HVACAction.FAN
+
+    if device.mode == constants.Mode.DRY:
+        return HVACAction.DRYING
+
+    unit_no_demand = not device.demand
+
+    # note that not all units set the "demand" flag, thus we also fall back to checking
+    # whether the current temperature is around the target temperature
+
+    if device.mode == constants.Mode.HEAT:
+        return (
+            HVACAction.IDLE
+            if unit_no_demand and device.current_temperature >= device.target_temperature
+            else HVACAction.HEATING
+        )
+
+    if device.mode == constants.Mode.COOL:
+        return (
+            HVACAction.IDLE
+            if unit_no_demand and device.current_temperature <= device.target_temperature
+            else HVACAction.COOLING
+        )
+
+    if device.mode == constants.Mode.AUTO:
+        if device.current_temperature == device.target_temperature:
+            return HVACAction.IDLE
+
+        if device.current_temperature > device.target_temperature:
+            return HVACAction.COOLING
+
+        return HVACAction.HEATING
+
+    return HVACAction.OFF
+
+
+@dataclass
+class UnitRuntime:
+    """Everything kept per unit - a handful of numbers, no matter how long it has been tracked for."""
+
+    # seconds
+    compressor: float = 0.0
+    heating: float = 0.0
+    cooling: float = 0.0
+    # exponentially weighted moving averages over RUNTIME_DUTY_CYCLE_WINDOW, as a fraction of time
+    heating_duty_cycle: float = 0.0
+    cooling_duty_cycle: float = 0.0
+    # what the unit was doing as of the last update, and when that was (as a UNIX timestamp)
+    compressor_running: bool = False
+    action: str | None = None
+    updated: float | None = None
+
+    @property
+    def published(self) -> tuple:
+        """The values as shown by the sensors, to tell when they need writing."""
+        return (
+            round(self.compressor / 3600, 2),
+            round(self.heating / 3600, 2),
+            round(self.cooling / 3600, 2),
+            round(self.heating_duty_cycle * 100, 1),
+            round(self.cooling_duty_cycle * 100, 1),
+        )
+
+    def update(self, device: models.Device, now: float, max_gap: float = RUNTIME_MAX_GAP) -> None:
+        """
+        Account for the time since the last update, assuming the unit kept doing what it was doing back then.
+        """
+        if self.updated is not None and 0 < (elapsed := now - self.updated) <= max_gap:
+            heating = self.action == HVACAction.HEATING
+            cooling = self.action == HVACAction.COOLING
+
+            self.compressor += elapsed * self.compressor_running
+            self.heating += elapsed * heating
+            self.cooling += elapsed * cooling
+
+            weight = 1 - math.exp(-elapsed / RUNTIME_DUTY_CYCLE_WINDOW)
+            self.heating_duty_cycle += weight * (heating - self.heating_duty_cycle)
+            self.cooling_duty_cycle += weight * (cooling - self.cooling_duty_cycle)
+
+        # longer gaps (e.g. Home Assistant being down) are not accounted for, as it is unknown what happened then
+
+        self.action = device_hvac_action(device)
+        self.compressor_running = device.demand or self.action in (HVACAction.HEATING, HVACAction.COOLING)
+        self.updated = now
+
+
+class RuntimeTracker:
+    """
+    Accumulates the runtime and duty cycle of every unit of a gateway from the state it is polled in,
+    persisting them so they survive restarts without anything having to go through the recorder's history.
+
+    Gaps between updates are accounted for up to max_gap, which has to allow for the longest poll interval.
+    """
+
+    def __init__(self, hass: HomeAssistant, serial_number: str, max_gap: float = RUNTIME_MAX_GAP) -> None:
+        self.units: dict[str, UnitRuntime] = {}
+        self.max_gap = max_gap
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.runtime_{serial_number}")
+
+    async def async_load(self) -> None:
+        if data := await self._store.async_load():
+            self.units = {uid: UnitRuntime(**unit) for uid, unit in data.items()}
+
+    async def async_save(self) -> None:
+        await self._store.async_save(self._data_to_save())
+
+    def update(self, devices: dict[str, models.Device]) -> set[str]:
+        """
+        Update the statistics of the given units, keyed by UID.
+
+        Returns the UIDs of units whose published values changed.
+        """
+        now = time.time()
+        changed = set()
+
+        for uid, device in devices.items():
+            if (runtime := self.units.get(uid)) is None:
+                runtime = self.units[uid] = UnitRuntime()
+
+            published = runtime.published
+            runtime.update(device, now, self.max_gap)
+
+            if runtime.published != published:
+                changed.add(uid)
+
+        self._store.async_delay_save(self._data_to_save, RUNTIME_SAVE_DELAY)
+
+        return changed
+
+    def _data_to_save(self) -> dict[str, Any]:
+        return {uid: asdict(runtime) for uid, runtime in self.units.items()}
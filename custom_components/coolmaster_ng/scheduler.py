@@ -0,0 +1,98 @@
+"""Scheduling of polls across all configured gateways."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+import async_timeout
+
+from .const import MAX_CONCURRENT_POLLS, POLL_TIMEOUT
+
+_LOGGER = logging.getLogger(__name__)
+
+# successive multiples of the golden ratio spread any number of phases evenly, without reshuffling existing ones
+PHASE_STEP = (math.sqrt(5) - 1) / 2
+
+
+class PollScheduler:
+    """
+    Shared by all config entries, so gateways do not all wake up at once.
+
+    Each gateway is given a phase within its poll interval, and its polls are aligned to it. On top of that
+    at most max_concurrent polls run at any time; a poll waiting for its turn (or for a busy event loop)
+    accumulates lag, which is recorded per gateway. A poll taking longer than timeout is cancelled,
+    so a gateway which hangs does not keep the others waiting.
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_POLLS, timeout: float = POLL_TIMEOUT):
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.timeout = timeout
+        # slot numbers per gateway serial number, a slot determines the phase
+        self._slots: dict[str, int] = {}
+        # lag of the last poll of each gateway, in seconds
+        self.lags: dict[str, float] = {}
+
+    def register(self, serial_number: str) -> None:
+        if serial_number in self._slots:
+            return
+
+        # reuse the lowest free slot, so phases remain spread out as gateways come and go
+        self._slots[serial_number] = min(set(range(len(self._slots) + 1)) - set(self._slots.values()))
+
+    def unregister(self, serial_number: str) -> None:
+        self._slots.pop(serial_number, None)
+        self.lags.pop(serial_number, None)
+
+    @property
+    def gateways(self) -> int:
+        return len(self._slots)
+
+    def phase(self, serial_number: str) -> float:
+        """Return the gateway's phase, as a fraction of its poll interval."""
+        return (self._slots.get(serial_number, 0) * PHASE_STEP) % 1
+
+    def next_poll_time(self, serial_number: str, now: datetime, interval: timedelta) -> datetime:
+        """
+        Return the first point in time aligned to the gateway's phase, at least half an interval from now.
+
+        Aligning to the phase rather than to the previous poll means gateways sharing an interval never coincide,
+        while the time between polls still averages out to the interval.
+        """
+        period = interval.total_seconds()
+
+        if period <= 0:
+            return now
+
+        offset = self.phase(serial_number) * period
+        earliest = now.timestamp() + period / 2
+
+        return datetime.fromtimestamp(math.ceil((earliest - offset) / period) * period + offset, tz=now.tzinfo)
+
+    @asynccontextmanager
+    async def async_poll_slot(self, serial_number: str, scheduled: float | None = None) -> AsyncIterator[float]:
+        """
+        Wait for a free poll slot, yielding the gateway's lag.
+
+        The lag counts from the monotonic time the poll was scheduled for if known, from now otherwise.
+        The poll is cancelled with asyncio.TimeoutError if it holds the slot for longer than the timeout.
+        """
+        requested = time.monotonic()
+
+        async with self._semaphore:
+            lag = self.lags[serial_number] = max(time.monotonic() - (scheduled or requested), 0.0)
+
+            timeout = async_timeout.timeout(self.timeout)
+
+            try:
+                async with timeout:
+                    yield lag
+            except asyncio.TimeoutError:
+                if timeout.expired:
+                    _LOGGER.warning("Poll of %s took longer than %ss, cancelled it", serial_number, self.timeout)
+
+                raise
@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.sensor import SensorDeviceClass, SensorEntity, SensorStateClass
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import DATA_BYTES, PERCENTAGE, TIME_HOURS, TIME_SECONDS
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity import DeviceInfo, EntityCategory
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from pycoolmasternet_ng import models
+
+from . import RUNTIME_FIELD, CoolmasterDataUpdateCoordinator, device_context
+from .const import DATA_COORDINATOR, DOMAIN, FAST_SCAN_INTERVAL, SIGNAL_UNITS_ADDED
+from .mixins import UtilityEntityMixin
+from .runtime import UnitRuntime
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Add sensors for passed config_entry in HA."""
+    entry_data = hass.data[DOMAIN][config_entry.entry_id]
+    coordinator = entry_data[DATA_COORDINATOR]
+
+    new_devices: list[BaseGatewaySensor] = [
+        PollDurationSensor(coordinator),
+        PollLagSensor(coordinator),
+        UpdateIntervalSensor(coordinator),
+        SkippedStateWritesSensor(coordinator),
+    ]
+
+    if hasattr(coordinator.gateway.transport, "telemetry"):
+        new_devices += [
+            CommandLatencySensor(coordinator),
+            CommandTimeoutsSensor(coordinator),
+            CommandErrorsSensor(coordinator),
+            CommandRetriesSensor(coordinator),
+            BytesSentSensor(coordinator),
+            BytesReceivedSensor(coordinator),
+        ]
+
+    async_add_entities(new_devices)
+
+    @callback
+    def async_add_units(devices: list[models.Device]) -> None:
+        unit_sensors: list[BaseRuntimeSensor] = []
+
+        for device in devices:
+            unit_sensors += [
+                CompressorRuntimeSensor(coordinator, device),
+                HeatingRuntimeSensor(coordinator, device),
+                CoolingRuntimeSensor(coordinator, device),
+                HeatingDutyCycleSensor(coordinator, device),
+                CoolingDutyCycleSensor(coordinator, device),
+            ]
+
+        if unit_sensors:
+            async_add_entities(unit_sensors)
+
+    async_add_units(list(coordinator.gateway.devices.values()))
+
+    # units added to the gateway later on, see CoolmasterDataUpdateCoordinator._async_sync_units
+    config_entry.async_on_unload(
+        async_dispatcher_connect(hass, SIGNAL_UNITS_ADDED.format(config_entry.entry_id), async_add_units)
+    )
+
+
+class BaseGatewaySensor(CoordinatorEntity, SensorEntity):
+    """A diagnostic sensor describing the gateway connection rather than a unit."""
+
+    title = "Base Gateway Sensor"
+    coordinator: CoolmasterDataUpdateCoordinator
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, coordinator: CoolmasterDataUpdateCoordinator) -> None:
+        super().__init__(coordinator=coordinator)
+
+        serial_number = coordinator.gateway.serial_number
+
+        self._attr_device_info = DeviceInfo(identifiers={(DOMAIN, serial_number)})
+        self._attr_unique_id = serial_number + "-" + self.title.lower().replace(" ", "_")
+        self._attr_name = f"{serial_number} {self.title}"
+
+    @property
+    def available(self) -> bool:
+        # these describe the connection itself, so remain meaningful when polls fail
+        return True
+
+    @property
+    def telemetry(self):
+        return self.coordinator.gateway.transport.telemetry
+
+
+class PollDurationSensor(BaseGatewaySensor):
+    title = "Poll duration"
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = TIME_SECONDS
+
+    @property
+    def native_value(self) -> float | None:
+        return self.coordinator.poll_telemetry.polls.last
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        poll_telemetry = self.coordinator.poll_telemetry
+        slowest_unit, slowest_unit_duration = poll_telemetry.slowest_unit or (None, None)
+
+        return {
+            "average": poll_telemetry.polls.average,
+            "p95": poll_telemetry.polls.percentile(95),
+            "max": poll_telemetry.polls.max,
+            "failed_polls": poll_telemetry.failed_polls,
+            "slowest_unit": slowest_unit,
+            "slowest_unit_duration": slowest_unit_duration,
+        }
+
+
+class PollLagSensor(BaseGatewaySensor):
+    title = "Poll lag"
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = TIME_SECONDS
+
+    @property
+    def native_value(self) -> float | None:
+        return self.coordinator.poll_telemetry.lags.last
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        return {
+            "max": self.coordinator.poll_telemetry.lags.max,
+            "phase": self.coordinator.scheduler.phase(self.coordinator.gateway.serial_number),
+        }
+
+
+class UpdateIntervalSensor(BaseGatewaySensor):
+    title = "Poll interval"
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_native_unit_of_measurement = TIME_SECONDS
+
+    @property
+    def native_value(self) -> float:
+        return self.coordinator.update_interval.total_seconds()
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        # what the adaptive interval is currently reacting to, and the bounds it moves between
+        return {
+            "reason": self.coordinator.update_interval_reason,
+            "fast_interval": FAST_SCAN_INTERVAL.total_seconds(),
+            "max_interval": self.coordinator.max_update_interval.total_seconds(),
+        }
+
+
+class SkippedStateWritesSensor(BaseGatewaySensor):
+    title = "Skipped state writes"
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    @property
+    def native_value(self) -> int:
+        return self.coordinator.skipped_state_writes
+
+
+class CommandLatencySensor(BaseGatewaySensor):
+    title = "Command latency"
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = TIME_SECONDS
+
+    @property
+    def native_value(self) -> float | None:
+        return self.telemetry.average_latency
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        # average and 95th percentile per command type, the full histograms are in the diagnostics
+        return {
+            name: {"count": histogram.count, "average": histogram.average, "p95": histogram.percentile(95)}
+            for name, histogram in sorted(self.telemetry.latencies.items())
+        }
+
+
+class CommandTimeoutsSensor(BaseGatewaySensor):
+    title = "Command timeouts"
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    @property
+    def native_value(self) -> int:
+        return self.telemetry.timeouts
+
+
+class CommandErrorsSensor(BaseGatewaySensor):
+    title = "Command errors"
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    @property
+    def native_value(self) -> int:
+        return self.telemetry.connection_errors + self.telemetry.remote_errors
+
+    @property
+    def extra_state_attributes(self) -> dict[str, int]:
+        return {
+            "connection_errors": self.telemetry.connection_errors,
+            "remote_errors": self.telemetry.remote_errors,
+        }
+
+
+class CommandRetriesSensor(BaseGatewaySensor):
+    title = "Command retries"
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    @property
+    def native_value(self) -> int:
+        return self.coordinator.gateway.transport.retries
+
+
+class BytesSentSensor(BaseGatewaySensor):
+    title = "Bytes sent"
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_native_unit_of_measurement = DATA_BYTES
+
+    @property
+    def native_value(self) -> int:
+        return self.telemetry.bytes_out
+
+
+class BytesReceivedSensor(BaseGatewaySensor):
+    title = "Bytes received"
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_native_unit_of_measurement = DATA_BYTES
+
+    @property
+    def native_value(self) -> int:
+        return self.telemetry.bytes_in
+
+
+class BaseRuntimeSensor(UtilityEntityMixin, CoordinatorEntity, SensorEntity):
+    """A unit's runtime statistic, see RuntimeTracker."""
+
+    title = "Base Runtime Sensor"
+    coordinator: CoolmasterDataUpdateCoordinator
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, coordinator: CoolmasterDataUpdateCoordinator, device: models.Device) -> None:
+        self.device = device
+
+        super().__init__(coordinator=coordinator, context=device_context(device, (RUNTIME_FIELD,)))
+
+    @property
+    def runtime(self) -> UnitRuntime | None:
+        return self.coordinator.runtime.units.get(str(self.device.uid))
+
+
+class BaseRuntimeHoursSensor(BaseRuntimeSensor):
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_native_unit_of_measurement = TIME_HOURS
+    # UnitRuntime field, in seconds
+    field = ""
+
+    @property
+    def native_value(self) -> float | None:
+        if (runtime := self.runtime) is None:
+            return None
+
+        return round(getattr(runtime, self.field) / 3600, 2)
+
+
+class CompressorRuntimeSensor(BaseRuntimeHoursSensor):
+    title = "Compressor runtime"
+    field = "compressor"
+    _attr_icon = "mdi:heat-pump"
+
+
+class HeatingRuntimeSensor(BaseRuntimeHoursSensor):
+    title = "Heating runtime"
+    field = "heating"
+    _attr_icon = "mdi:fire"
+
+
+class CoolingRuntimeSensor(BaseRuntimeHoursSensor):
+    title = "Cooling runtime"
+    field = "cooling"
+    _attr_icon = "mdi:snowflake"
+
+
+class BaseDutyCycleSensor(BaseRuntimeSensor):
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = PERCENTAGE
+    # UnitRuntime field, as a fraction
+    field = ""
+
+    @property
+    def native_value(self) -> float | None:
+        if (runtime := self.runtime) is None:
+            return None
+
+        return round(getattr(runtime, self.field) * 100, 1)
+
+
+class HeatingDutyCycleSensor(BaseDutyCycleSensor):
+    title = "Heating duty cycle"
+    field = "heating_duty_cycle"
+    _attr_icon = "mdi:fire"
+
+
+class CoolingDutyCycleSensor(BaseDutyCycleSensor):
+    title = "Cooling duty cycle"
+    field = "cooling_duty_cycle"
+    _attr_icon = "mdi:snowflake"
@@ -0,0 +1,134 @@
+"""Services controlling many units at once, and for troubleshooting gateways."""
+from __future__ import annotations
+
+import asyncio
+import logging
+
+import voluptuous as vol
+from homeassistant.components.climate.const import HVACMode
+from homeassistant.components.group import expand_entity_ids
+from homeassistant.const import ATTR_AREA_ID, ATTR_DEVICE_ID, ATTR_ENTITY_ID, ATTR_TEMPERATURE, ENTITY_MATCH_ALL
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.service import async_extract_referenced_entity_ids
+from homeassistant.util.dt import utcnow
+from homeassistant.util.json import save_json
+from pycoolmasternet_ng import models
+
+from . import CoolmasterDataUpdateCoordinator
+from .climate import HA_STATE_TO_CM
+from .const import DATA_COORDINATOR, DOMAIN, SERVICE_BULK_SET_HVAC_MODE, SERVICE_DUMP_WIRE_TRACE
+
+_LOGGER = logging.getLogger(__name__)
+
+ATTR_HVAC_MODE = "hvac_mode"
+
+# unlike cv.make_entity_service_schema, targets are optional - without one, every gateway is targeted
+BULK_SET_HVAC_MODE_SCHEMA = vol.Schema(
+    {
+        **cv.ENTITY_SERVICE_FIELDS,
+        vol.Required(ATTR_HVAC_MODE): vol.In([HVACMode.OFF, *HA_STATE_TO_CM]),
+        vol.Optional(ATTR_TEMPERATURE): vol.Coerce(float),
+    }
+)
+
+DUMP_WIRE_TRACE_SCHEMA = vol.Schema(cv.ENTITY_SERVICE_FIELDS)
+
+
+def async_register_services(hass: HomeAssistant) -> None:
+    if hass.services.has_service(DOMAIN, SERVICE_BULK_SET_HVAC_MODE):
+        return
+
+    async def async_bulk_set_hvac_mode(call: ServiceCall) -> None:
+        hvac_mode = call.data[ATTR_HVAC_MODE]
+
+        await asyncio.gather(
+            *(
+                coordinator.async_bulk_control(
+                    devices,
+                    power_state=hvac_mode != HVACMode.OFF,
+                    mode=HA_STATE_TO_CM.get(hvac_mode),
+                    temperature=call.data.get(ATTR_TEMPERATURE),
+                )
+                for coordinator, devices in _async_resolve_targets(hass, call).items()
+            )
+        )
+
+    async def async_dump_wire_trace(call: ServiceCall) -> None:
+        for coordinator in _async_resolve_targets(hass, call):
+            if (trace := getattr(coordinator.gateway.transport, "trace", None)) is None:
+                continue
+
+            path = hass.config.path(f"{DOMAIN}_trace_{coordinator.gateway.serial_number}_{utcnow():%Y%m%d%H%M%S}.json")
+            await hass.async_add_executor_job(save_json, path, trace.as_list())
+
+            _LOGGER.info("Dumped the wire trace of %s to %s", coordinator.gateway, path)
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_BULK_SET_HVAC_MODE, async_bulk_set_hvac_mode, schema=BULK_SET_HVAC_MODE_SCHEMA
+    )
+    hass.services.async_register(DOMAIN, SERVICE_DUMP_WIRE_TRACE, async_dump_wire_trace, schema=DUMP_WIRE_TRACE_SCHEMA)
+
+
+def async_unregister_services(hass: HomeAssistant) -> None:
+    hass.services.async_remove(DOMAIN, SERVICE_BULK_SET_HVAC_MODE)
+    hass.services.async_remove(DOMAIN, SERVICE_DUMP_WIRE_TRACE)
+
+
+def _async_resolve_targets(
+    hass: HomeAssistant, call: ServiceCall
+) -> dict[CoolmasterDataUpdateCoordinator, list[models.Device] | None]:
+    """
+    Return the units targeted by a service call grouped by gateway, None meaning all units of that gateway.
+
+    Gateway devices target all their units, climate entities (directly, through a device, an area or a group)
+    their own unit. Without any target, every unit of every gateway is targeted.
+    """
+    coordinators: dict[str, CoolmasterDataUpdateCoordinator] = {
+        entry_id: entry_data[DATA_COORDINATOR]
+        for entry_id, entry_data in hass.data.get(DOMAIN, {}).items()
+        if isinstance(entry_data, dict) and DATA_COORDINATOR in entry_data
+    }
+
+    if call.data.get(ATTR_ENTITY_ID) == ENTITY_MATCH_ALL or not any(
+        call.data.get(key) for key in (ATTR_ENTITY_ID, ATTR_DEVICE_ID, ATTR_AREA_ID)
+    ):
+        return {coordinator: None for coordinator in coordinators.values()}
+
+    selected = async_extract_referenced_entity_ids(hass, call)
+    targets: dict[CoolmasterDataUpdateCoordinator, list[models.Device] | None] = {}
+
+    device_registry = dr.async_get(hass)
+    gateways = {coordinator.gateway.serial_number: coordinator for coordinator in coordinators.values()}
+
+    for device_id in selected.referenced_devices:
+        if (device_entry := device_registry.async_get(device_id)) is None:
+            continue
+
+        for domain, identifier in device_entry.identifiers:
+            if domain == DOMAIN and identifier in gateways:
+                targets[gateways[identifier]] = None
+
+    entity_registry = er.async_get(hass)
+
+    # groups are expanded to their members, including nested groups
+    for entity_id in expand_entity_ids(hass, selected.referenced | selected.indirectly_referenced):
+        if (entity_entry := entity_registry.async_get(entity_id)) is None or entity_entry.domain != "climate":
+            continue
+
+        if (coordinator := coordinators.get(entity_entry.config_entry_id)) is None:
+            continue
+
+        # the whole gateway is targeted already
+        if coordinator in targets and targets[coordinator] is None:
+            continue
+
+        uid = entity_entry.unique_id.removesuffix("-climate")
+
+        for device_uid, device in coordinator.gateway.devices.items():
+            if str(device_uid) == uid:
+                targets.setdefault(coordinator, []).append(device)
+
+    return targets
@@ -0,0 +1,503 @@
+"""
+An in-process CoolMasterNet gateway simulator, for testing and load generation without real hardware.
+
+It can be used directly as a transport (see SimulatorTransport) or served over TCP to act as a stand-in gateway
+for anything speaking the "Aserver" protocol, including the integration's own TCP transport:
+
+    python simulator.py --units 100 --port 10102 --latency 0.05 --baudrate 9600
+
+or over HTTP as a stand-in for the REST API (which requires aiohttp):
+
+    python simulator.py --units 100 --http --port 10103
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from pycoolmasternet_ng import transports
+from pycoolmasternet_ng.constants import CM_LOUVER_POSITION_STATE_MAP, PROMPT, FanMode, LouverPositionState, Mode
+
+_LOGGER = logging.getLogger(__name__)
+
+UNITS_PER_LINE = 100
+
+# line types assigned to lines 1 to 7 in turn, line 8 is left unused as it only supports Fujitsu
+LINE_TYPES = ["ME", "DK", "LG", "SM", "GR", "MD", "TR"]
+
+# result codes, see pycoolmasternet_ng.exceptions
+ERROR_NO_UID = 1
+ERROR_BAD_FORMAT = 3
+ERROR_FAILED = 4
+ERROR_UNKNOWN_COMMAND = 6
+
+FSPEED_ARG_TO_FAN_MODE = {fan_mode.value[0].lower(): fan_mode for fan_mode in FanMode}
+
+MODE_COMMANDS = {mode.value.lower(): mode for mode in Mode}
+
+# commands addressing a single unit, anything else the gateway does not know
+UNIT_COMMANDS = {"query", "on", "off", "temp", "feed", "fspeed", "swing", "filt", *MODE_COMMANDS}
+
+# error codes units report in their status, "CE" being a unit which does not respond to commands
+UNIT_ERROR_CODES = ["CE", "U4", "A3", "E7"]
+
+
+class SimulatorError(Exception):
+    def __init__(self, code: int):
+        super().__init__(code)
+        self.code = code
+
+
+@dataclass
+class SimulatedUnit:
+    """An indoor unit and its state, as seen by the gateway."""
+
+    uid: str
+    name: str
+    modes: str = "c h f d a"
+    fan_speeds: str = "l m h a"
+    louver_position: LouverPositionState = LouverPositionState.STOP_SWING
+    power_state: bool = False
+    mode: Mode = Mode.COOL
+    fan_mode: FanMode = FanMode.AUTO
+    target_temperature: Decimal = Decimal("22.0")
+    current_temperature: Decimal = Decimal("24.0")
+    filter_sign: bool = False
+    error_code: str | None = None
+    last_update: float = field(default_factory=time.monotonic)
+
+    @property
+    def demand(self) -> bool:
+        if not self.power_state:
+            return False
+
+        if self.mode == Mode.HEAT:
+            return self.current_temperature < self.target_temperature
+
+        if self.mode in (Mode.COOL, Mode.DRY):
+            return self.current_temperature > self.target_temperature
+
+        return self.mode == Mode.AUTO and self.current_temperature != self.target_temperature
+
+    def update_temperature(self) -> None:
+        """Drift the room temperature towards the target by 0.1 degree per minute while the unit is running."""
+        now = time.monotonic()
+        steps = int((now - self.last_update) / 60)
+
+        if not steps:
+            return
+
+        self.last_update = now
+
+        if self.demand:
+            step = Decimal("0.1") if self.current_temperature < self.target_temperature else Decimal("-0.1")
+            difference = abs(self.target_temperature - self.current_temperature)
+            self.current_temperature += step * min(steps, int(difference / Decimal("0.1")))
+
+    def ls_line(self) -> str:
+        self.update_temperature()
+
+        return " ".join(
+            [
+                self.uid,
+                "ON" if self.power_state else "OFF",
+                f"{self.target_temperature:.1f}C",
+                f"{self.current_temperature:.1f}C",
+                self.fan_mode.value,
+                self.mode.value,
+                self.error_code or "OK",
+                "#" if self.filter_sign else "-",
+                "1" if self.demand else "0",
+            ]
+        )
+
+
+class SimulatedGateway:
+    """
+    Models a CoolMasterNet gateway with any number of indoor units and answers its text protocol.
+    """
+
+    def __init__(self, units: int = 10, serial_number: str | None = None, seed: int | None = None):
+        if units > len(LINE_TYPES) * UNITS_PER_LINE:
+            raise ValueError(f"At most {len(LINE_TYPES) * UNITS_PER_LINE} units can be simulated")
+
+        rng = random.Random(seed)
+
+        self.serial_number = serial_number or f"283B960SIM{units:04d}"
+        self.units: dict[str, SimulatedUnit] = {}
+
+        for index in range(units):
+            uid = f"L{index // UNITS_PER_LINE + 1}.1{index % UNITS_PER_LINE:02d}"
+
+            self.units[uid] = SimulatedUnit(
+                uid=uid,
+                name=f"Unit {index + 1}",
+                # a realistic mix of capabilities
+                fan_speeds=rng.choice(["l m h a", "l m h", "v l m h t a"]),
+                louver_position=(
+                    LouverPositionState.NOT_SUPPORTED if index % 3 == 2 else LouverPositionState.STOP_SWING
+                ),
+                power_state=rng.random() < 0.5,
+                mode=rng.choice([Mode.COOL, Mode.HEAT]),
+                target_temperature=Decimal(rng.randint(18, 26)),
+                current_temperature=Decimal(rng.randint(160, 300)) / 10,
+            )
+
+        self.lines = min(len(LINE_TYPES), (units - 1) // UNITS_PER_LINE + 1) if units else 1
+
+    def handle(self, command: str) -> list[str]:
+        """
+        Execute a command and return the response lines, including the final result line.
+        """
+        try:
+            return self._handle(command.split()) + ["OK"]
+        except SimulatorError as exc:
+            return [f"ERROR:{exc.code}"]
+
+    def _get_unit(self, args: list[str], index: int = 1) -> SimulatedUnit:
+        if len(args) <= index:
+            raise SimulatorError(ERROR_BAD_FORMAT)
+
+        try:
+            return self.units[args[index]]
+        except KeyError:
+            raise SimulatorError(ERROR_NO_UID)
+
+    def _get_arg(self, args: list[str], index: int = 2) -> str:
+        if len(args) <= index:
+            raise SimulatorError(ERROR_BAD_FORMAT)
+
+        return args[index]
+
+    def _handle(self, args: list[str]) -> list[str]:
+        if not args:
+            return []
+
+        command = args[0]
+
+        if command == "set":
+            return [
+                f"S/N            : {self.serial_number}",
+                "Version        : 1.0.0",
+                "Baud           : 9600",
+                "Deg            : C",
+            ]
+
+        if command == "ifconfig":
+            return ["MAC    : 02:00:00:00:00:01", "IP     : 127.0.0.1"]
+
+        if command == "simul":
+            return []
+
+        if command == "line":
+            results = []
+
+            for number in range(1, 9):
+                if number <= self.lines:
+                    count = sum(1 for uid in self.units if uid.startswith(f"L{number}."))
+                    results.append(f"L{number}: {LINE_TYPES[number - 1]} Master U{count:02d}/G00 HVAC Units: {count}")
+                else:
+                    results.append(f"L{number}: Unused")
+
+                results.append("   Tx:0/0 Rx:0/0 TO:0/0 CS:0/0 Col:0/0 NAK:0/0")
+
+            return results
+
+        if command == "props":
+            return ["UID    | Name | Modes | Fspeeds", "-" * 32] + [
+                f"{unit.uid} | {unit.name} | {unit.modes} | {unit.fan_speeds}" for unit in self.units.values()
+            ]
+
+        if command in ("allon", "alloff"):
+            for unit in self.units.values():
+                # units not responding to commands are left as they are, like on a real gateway
+                if unit.error_code != "CE":
+                    unit.power_state = command == "allon"
+
+            return []
+
+        if command == "ls2":
+            if len(args) > 1:
+                return [self._get_unit(args).ls_line()]
+
+            return [unit.ls_line() for unit in self.units.values()]
+
+        if command not in UNIT_COMMANDS:
+            raise SimulatorError(ERROR_UNKNOWN_COMMAND)
+
+        unit = self._get_unit(args)
+
+        if command == "query":
+            return [self._query(unit, self._get_arg(args))]
+
+        if unit.error_code == "CE":
+            # simulates a unit which does not respond to commands
+            raise SimulatorError(ERROR_FAILED)
+
+        if command in ("on", "off"):
+            unit.power_state = command == "on"
+        elif command in MODE_COMMANDS:
+            unit.mode = MODE_COMMANDS[command]
+        elif command == "temp":
+            unit.target_temperature = Decimal(self._get_arg(args))
+        elif command == "feed":
+            unit.current_temperature = Decimal(self._get_arg(args))
+        elif command == "fspeed":
+            try:
+                unit.fan_mode = FSPEED_ARG_TO_FAN_MODE[self._get_arg(args)]
+            except KeyError:
+                raise SimulatorError(ERROR_BAD_FORMAT)
+        elif command == "swing":
+            if unit.louver_position == LouverPositionState.NOT_SUPPORTED:
+                raise SimulatorError(ERROR_FAILED)
+
+            try:
+                unit.louver_position = CM_LOUVER_POSITION_STATE_MAP[self._get_arg(args)]
+            except KeyError:
+                raise SimulatorError(ERROR_BAD_FORMAT)
+        elif command == "filt":
+            unit.filter_sign = False
+
+        return []
+
+    def _query(self, unit: SimulatedUnit, datapoint: str) -> str:
+        if datapoint == "s":
+            return unit.louver_position.value
+        if datapoint == "o":
+            return "1" if unit.power_state else "0"
+        if datapoint == "t":
+            return str(int(unit.target_temperature))
+        if datapoint == "h":
+            return f"{unit.target_temperature:.1f}"
+        if datapoint == "a":
+            return f"{unit.current_temperature:.1f}"
+        if datapoint == "e":
+            return unit.error_code or "OK"
+
+        raise SimulatorError(ERROR_BAD_FORMAT)
+
+
+@dataclass
+class SimulatorConditions:
+    """
+    Link conditions and faults to simulate.
+
+    :param latency: seconds added to every exchange
+    :param baudrate: if set, throttle throughput as if going over a serial line (10 bits per byte)
+    :param error_rate: probability of a command failing with a gateway error
+    :param timeout_rate: probability of a command timing out as if the connection dropped
+    :param missing_data_rate: probability of the gateway's "...Missing data..." quirk (TCP server only)
+    :param unit_errors: error codes units keep reporting, by UID ("CE" also has them ignore commands)
+    :param unit_fault_rate: probability of a random unit developing a fault from UNIT_ERROR_CODES on a command,
+        or of a faulty one recovering
+    """
+
+    latency: float = 0.0
+    baudrate: int | None = None
+    error_rate: float = 0.0
+    timeout_rate: float = 0.0
+    missing_data_rate: float = 0.0
+    unit_errors: dict[str, str] = field(default_factory=dict)
+    unit_fault_rate: float = 0.0
+    timeout: float = 10.0
+    seed: int | None = None
+
+    def __post_init__(self):
+        self.random = random.Random(self.seed)
+
+    async def async_transmit(self, num_bytes: int) -> None:
+        delay = self.latency
+
+        if self.baudrate:
+            delay += num_bytes * 10 / self.baudrate
+
+        if delay:
+            await asyncio.sleep(delay)
+
+    async def async_apply_faults(self, gateway: SimulatedGateway, command: str) -> list[str] | None:
+        """
+        Return a faulty response for the command, if one is to be injected, after injecting unit faults.
+        """
+        self.apply_unit_faults(gateway)
+
+        if self.timeout_rate and self.random.random() < self.timeout_rate:
+            await asyncio.sleep(self.timeout)
+            raise ConnectionError(f"Simulated timeout on {command!r}")
+
+        if self.error_rate and self.random.random() < self.error_rate:
+            return [f"ERROR:{ERROR_FAILED}"]
+
+        return None
+
+    def apply_unit_faults(self, gateway: SimulatedGateway) -> None:
+        for uid, error_code in self.unit_errors.items():
+            if unit := gateway.units.get(uid):
+                unit.error_code = error_code
+
+        if not self.unit_fault_rate or not gateway.units or self.random.random() >= self.unit_fault_rate:
+            return
+
+        unit = self.random.choice(list(gateway.units.values()))
+
+        if unit.uid not in self.unit_errors:
+            unit.error_code = None if unit.error_code else self.random.choice(UNIT_ERROR_CODES)
+
+
+class SimulatorTransport(transports.CharTransportBase):
+    """
+    A transport talking to an in-process SimulatedGateway.
+    """
+
+    def __init__(self, gateway: SimulatedGateway, conditions: SimulatorConditions | None = None):
+        self.gateway = gateway
+        self.conditions = conditions or SimulatorConditions()
+
+    async def _async_exchange(self, command: str) -> list[str]:
+        response = await self.conditions.async_apply_faults(self.gateway, command) or self.gateway.handle(command)
+        await self.conditions.async_transmit(len(command) + 1 + sum(len(line) + 2 for line in response))
+        return response
+
+    async def command(self, command: str) -> list[str]:
+        return self._parse_response(await self._async_exchange(command))
+
+    def __str__(self):
+        return f"Simulator ({len(self.gateway.units)} units)"
+
+
+async def async_serve(
+    gateway: SimulatedGateway,
+    host: str = "127.0.0.1",
+    port: int = 10102,
+    conditions: SimulatorConditions | None = None,
+) -> asyncio.AbstractServer:
+    """
+    Serve the simulated gateway over TCP, speaking the same protocol as a real gateway's "Aserver".
+    """
+    conditions = conditions or SimulatorConditions()
+
+    async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        writer.write(b"\r\n" + PROMPT)
+
+        try:
+            while line := await reader.readline():
+                command = line.decode("utf-8").strip()
+
+                if not command:
+                    # an empty line just gets a new prompt, which is what keep-alives rely on
+                    response = [""]
+                else:
+                    response = await conditions.async_apply_faults(gateway, command) or gateway.handle(command)
+
+                    if conditions.missing_data_rate and conditions.random.random() < conditions.missing_data_rate:
+                        response = ["...Missing data..."] + response
+
+                await conditions.async_transmit(len(line) + sum(len(response_line) + 2 for response_line in response))
+
+                writer.write("".join(f"{response_line}\r\n" for response_line in response).encode("utf-8") + PROMPT)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle_connection, host, port)
+
+
+async def async_serve_http(
+    gateway: SimulatedGateway,
+    host: str = "127.0.0.1",
+    port: int = 10103,
+    conditions: SimulatorConditions | None = None,
+):
+    """
+    Serve the simulated gateway's "raw" REST API endpoint over HTTP, returning the started aiohttp AppRunner.
+    """
+    from aiohttp import web
+
+    conditions = conditions or SimulatorConditions()
+
+    async def handle_raw(request: web.Request) -> web.Response:
+        if request.match_info["serial_number"] != gateway.serial_number:
+            return web.json_response({"rc": "Wrong Serial Number", "data": []}, status=404)
+
+        command = request.query.get("command", "").strip()
+        response = await conditions.async_apply_faults(gateway, command) or gateway.handle(command)
+        await conditions.async_transmit(len(command) + sum(len(response_line) + 2 for response_line in response))
+
+        return web.json_response({"rc": response[-1], "data": response[:-1]})
+
+    app = web.Application()
+    app.router.add_get("/v1.0/device/{serial_number}/raw", handle_raw)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+
+    return runner
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve a simulated CoolMasterNet gateway over TCP or HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="defaults to 10102, or 10103 with --http")
+    parser.add_argument("--http", action="store_true", help="serve the REST API instead of the TCP protocol")
+    parser.add_argument("--units", type=int, default=10)
+    parser.add_argument("--serial-number")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to each exchange")
+    parser.add_argument("--baudrate", type=int, help="throttle throughput as if over a serial line")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--missing-data-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--unit-error",
+        action="append",
+        default=[],
+        metavar="UID=CODE",
+        help="have a unit keep reporting an error code, CE also has it ignore commands (repeatable)",
+    )
+    parser.add_argument("--unit-fault-rate", type=float, default=0.0, help="probability of units failing/recovering")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    gateway = SimulatedGateway(units=args.units, serial_number=args.serial_number, seed=args.seed)
+    conditions = SimulatorConditions(
+        latency=args.latency,
+        baudrate=args.baudrate,
+        error_rate=args.error_rate,
+        timeout_rate=args.timeout_rate,
+        missing_data_rate=args.missing_data_rate,
+        unit_errors=dict(unit_error.split("=", 1) for unit_error in args.unit_error),
+        unit_fault_rate=args.unit_fault_rate,
+        seed=args.seed,
+    )
+
+    port = args.port or (10103 if args.http else 10102)
+
+    async def serve_forever() -> None:
+        _LOGGER.info("Simulating %s (%d units) on %s:%d", gateway.serial_number, args.units, args.host, port)
+
+        if args.http:
+            runner = await async_serve_http(gateway, args.host, port, conditions)
+
+            try:
+                await asyncio.Event().wait()
+            finally:
+                await runner.cleanup()
+        else:
+            server = await async_serve(gateway, args.host, port, conditions)
+
+            async with server:
+                await server.serve_forever()
+
+    asyncio.run(serve_forever())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Persistent cache of discovered gateway metadata, so setup does not have to wait for the gateway."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from pycoolmasternet_ng import constants, models, transports
+from pycoolmasternet_ng.structures import UID, Line
+
+from .const import DOMAIN
+
+STORAGE_VERSION = 1
+
+
+class GatewayStore(Store):
+    """
+    Stores everything discovered about a gateway: its settings, model, MAC address, HVAC lines,
+    units along with their properties and last known state.
+    """
+
+    def __init__(self, hass: HomeAssistant, serial_number: str) -> None:
+        super().__init__(hass, STORAGE_VERSION, f"{DOMAIN}.gateway_{serial_number}")
+
+    async def async_save_gateway(self, gateway: models.Gateway, model: str, mac: str | None) -> None:
+        await self.async_save(serialize_gateway(gateway, model, mac))
+
+
+def _serialize_line(line: Line) -> dict[str, Any]:
+    return {
+        "number": line.number,
+        "type": line.type.value,
+        "properties": line.properties,
+        "link_stats": line.link_stats,
+    }
+
+
+def _deserialize_line(data: dict[str, Any]) -> Line:
+    return Line(
+        number=data["number"],
+        type=constants.LineType(data["type"]),
+        properties=data["properties"],
+        link_stats={key: tuple(value) for key, value in data["link_stats"].items()},
+    )
+
+
+def format_ls_line(device: models.Device) -> str:
+    """
+    Format the device's state as an "ls2" line, the inverse of Device._populate_from_ls_line.
+    """
+    unit = device.temperature_unit
+
+    return " ".join(
+        [
+            str(device.uid),
+            "ON" if device.power_state else "OFF",
+            f"{device.target_temperature}{unit}",
+            f"{device.current_temperature}{unit}",
+            device.fan_mode.value,
+            device.mode.value,
+            device.error_code or "OK",
+            "#" if device.filter_sign else "-",
+            "1" if device.demand else "0",
+        ]
+    )
+
+
+def serialize_gateway(gateway: models.Gateway, model: str, mac: str | None) -> dict[str, Any]:
+    return {
+        "model": model,
+        "mac": mac,
+        "settings": gateway._settings,
+        "lines": [_serialize_line(line) for line in gateway.lines.values()],
+        "properties": {str(uid): props for uid, props in gateway.properties.items()},
+        "devices": {
+            str(uid): {
+                "ls": format_ls_line(device),
+                "louver_position": device.louver_position.value,
+                "hvac_line": _serialize_line(device.hvac_line),
+            }
+            for uid, device in gateway.devices.items()
+        },
+    }
+
+
+def deserialize_gateway(transport: transports.BaseTransport, data: dict[str, Any]) -> models.Gateway:
+    """
+    Rebuild a Gateway and its devices from cached data, without talking to the gateway.
+    """
+    gateway = models.Gateway(transport)
+
+    gateway._settings = data["settings"]
+    gateway._properties = {UID.from_string(uid): props for uid, props in data["properties"].items()}
+    gateway._lines = {line.number: line for line in map(_deserialize_line, data["lines"])}
+    gateway._coolplug_lines = {}
+    gateway._devices = {}
+
+    for uid_string, device_data in data["devices"].items():
+        uid = UID.from_string(uid_string)
+
+        device = models.Device(
+            gateway=gateway,
+            uid=uid,
+            hvac_line=_deserialize_line(device_data["hvac_line"]),
+            properties=gateway.properties.get(uid, {}),
+        )
+        device._populate_from_ls_line(device_data["ls"])
+        device._louver_position = constants.LouverPositionState(device_data["louver_position"])
+
+        gateway._devices[uid] = device
+
+    return gateway
@@ -0,0 +1,87 @@
+"""Near real-time state updates from a continuous status stream."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Callable
+
+from pycoolmasternet_ng import exceptions, transports
+
+from .const import STREAM_INTERVAL, STREAM_RETRY_INTERVAL
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class StatusStream:
+    """
+    Streams the gateway-wide status listing over its own session, reporting only the lines which changed.
+
+    The gateway does not send unsolicited change reports, so the stream is made of "ls2" listings requested
+    back-to-back every STREAM_INTERVAL. Unchanged lines are dropped by a plain string comparison,
+    so only the units which actually changed are parsed and their entities notified.
+
+    :param on_changes: called with the changed lines keyed by UID
+    :param on_state: called with True when the stream (re)connects and with False when it drops
+    """
+
+    def __init__(
+        self,
+        transport: transports.BaseTransport,
+        on_changes: Callable[[dict[str, str]], None],
+        on_state: Callable[[bool], None],
+        interval: float = STREAM_INTERVAL,
+    ) -> None:
+        self.transport = transport
+        self.interval = interval
+        self.connected = False
+        self.listings = 0
+
+        self._on_changes = on_changes
+        self._on_state = on_state
+        self._lines: dict[str, str] = {}
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._async_run())
+
+    async def async_stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        if close := getattr(self.transport, "async_close", None):
+            await close()
+
+    async def _async_run(self) -> None:
+        while True:
+            try:
+                ls_lines = await self.transport.command("ls2")
+            except (OSError, asyncio.TimeoutError, exceptions.CoolMasterNetRemoteError) as exc:
+                if self.connected:
+                    _LOGGER.warning("Status stream of %s dropped, falling back to polling: %r", self.transport, exc)
+                    self._set_connected(False)
+
+                # the previous listing may be stale by the time the stream resumes, start afresh
+                self._lines = {}
+                await asyncio.sleep(STREAM_RETRY_INTERVAL)
+                continue
+
+            self.listings += 1
+
+            if not self.connected:
+                _LOGGER.debug("Status stream of %s connected", self.transport)
+                self._set_connected(True)
+
+            lines = {line.split(maxsplit=1)[0]: line for line in ls_lines if line.strip()}
+
+            if changes := {uid: line for uid, line in lines.items() if self._lines.get(uid) != line}:
+                self._on_changes(changes)
+
+            self._lines = lines
+
+            await asyncio.sleep(self.interval)
+
+    def _set_connected(self, connected: bool) -> None:
+        self.connected = connected
+        self._on_state(connected)
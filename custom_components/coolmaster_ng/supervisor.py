@@ -0,0 +1,142 @@
+"""Supervision of the connection to a gateway, so an unreachable gateway does not hold everything else up."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from collections.abc import Callable
+
+from pycoolmasternet_ng import exceptions, transports
+
+from .connection import TransportWrapper, async_command_many
+from .const import CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_PROBE_INTERVAL, CIRCUIT_PROBE_MAX_INTERVAL
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised in place of sending a command while the gateway is considered unreachable."""
+
+
+class CircuitBreakerTransport(TransportWrapper):
+    """
+    Stops sending commands to a gateway after CIRCUIT_FAILURE_THRESHOLD consecutive connection failures,
+    so they fail instantly instead of each waiting for a connection to time out.
+
+    While the circuit is open, the gateway is probed in the background with exponential backoff (with jitter,
+    so gateways which went down together are not probed in lockstep), from CIRCUIT_PROBE_INTERVAL
+    up to CIRCUIT_PROBE_MAX_INTERVAL. The circuit closes as soon as a probe gets an answer.
+    Errors reported by the gateway itself do not count as failures - it is reachable after all.
+
+    :param on_state: called with False when the circuit opens and with True when it closes again
+    """
+
+    def __init__(self, transport: transports.BaseTransport, on_state: Callable[[bool], None] | None = None):
+        super().__init__(transport)
+
+        self.on_state = on_state
+        self.failures = 0
+        self.trips = 0
+        self.probes = 0
+        # monotonic time the circuit opened at, None while closed
+        self.opened_at: float | None = None
+
+        self._probe_task: asyncio.Task | None = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    async def command(self, command: str) -> list[str]:
+        self._check()
+
+        try:
+            result = await self.transport.command(command)
+        except (OSError, asyncio.TimeoutError):
+            self._failed()
+            raise
+        except exceptions.CoolMasterNetRemoteError:
+            self.failures = 0
+            raise
+
+        self.failures = 0
+
+        return result
+
+    async def command_many(self, commands: list[str]) -> list[list[str] | Exception]:
+        self._check()
+
+        try:
+            results = await async_command_many(self.transport, commands)
+        except (OSError, asyncio.TimeoutError):
+            self._failed()
+            raise
+
+        self.failures = 0
+
+        return results
+
+    async def async_close(self) -> None:
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            self._probe_task = None
+
+        if close := getattr(self.transport, "async_close", None):
+            await close()
+
+    def _check(self) -> None:
+        if self.opened_at is not None:
+            raise CircuitOpenError(f"{self} is unreachable, waiting for it to recover")
+
+    def _failed(self) -> None:
+        self.failures += 1
+
+        if self.failures < CIRCUIT_FAILURE_THRESHOLD or self.opened_at is not None:
+            return
+
+        _LOGGER.warning("%s is unreachable, holding off commands until it recovers", self)
+
+        self.trips += 1
+        self.opened_at = time.monotonic()
+        self._probe_task = asyncio.create_task(self._async_probe())
+
+        if self.on_state:
+            self.on_state(False)
+
+    async def _async_probe(self) -> None:
+        attempt = 0
+
+        while True:
+            interval = min(CIRCUIT_PROBE_INTERVAL * 2**attempt, CIRCUIT_PROBE_MAX_INTERVAL)
+            await asyncio.sleep(interval * random.uniform(0.5, 1))
+
+            self.probes += 1
+
+            try:
+                await self.transport.command("set")
+            except (OSError, asyncio.TimeoutError):
+                attempt += 1
+                continue
+            except exceptions.CoolMasterNetRemoteError:
+                pass
+
+            break
+
+        _LOGGER.info("%s recovered after %.0fs", self, time.monotonic() - self.opened_at)
+
+        self.failures = 0
+        self.opened_at = None
+        self._probe_task = None
+
+        if self.on_state:
+            self.on_state(True)
+
+    def as_dict(self) -> dict:
+        return {
+            "open": self.is_open,
+            "open_for": time.monotonic() - self.opened_at if self.opened_at is not None else None,
+            "consecutive_failures": self.failures,
+            "trips": self.trips,
+            "probes": self.probes,
+        }
@@ -0,0 +1,263 @@
+"""Instrumentation of gateway commands and poll cycles, to tell where time is spent when polls are slow."""
+from __future__ import annotations
+
+import asyncio
+import time
+from bisect import bisect_left
+from collections import deque
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from pycoolmasternet_ng import exceptions, transports
+
+from .connection import TransportWrapper, async_command_many, unwrap_transport
+from .const import WIRE_TRACE_SIZE
+
+# upper bounds in seconds, the last bucket catches everything above
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# bytes framing a response besides its lines: the final "OK" line and the prompt
+RESPONSE_OVERHEAD = len("OK\r\n>")
+
+
+@dataclass
+class LatencyHistogram:
+    """Fixed-bucket histogram of durations, cheap enough to record every command."""
+
+    buckets: list[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    last: float | None = None
+
+    def record(self, duration: float) -> None:
+        self.buckets[bisect_left(LATENCY_BUCKETS, duration)] += 1
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.last = duration
+
+    @property
+    def average(self) -> float | None:
+        if not self.count:
+            return None
+
+        return self.total / self.count
+
+    def percentile(self, percentile: float) -> float | None:
+        """Return the upper bound of the bucket containing the given percentile, None if nothing was recorded."""
+        if not self.count:
+            return None
+
+        threshold = percentile / 100 * self.count
+        seen = 0
+
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            seen += count
+
+            if seen >= threshold:
+                return bound
+
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "average": self.average,
+            "max": self.max,
+            "last": self.last,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "buckets": {
+                f"<={bound}": count for bound, count in zip((*LATENCY_BUCKETS, float("inf")), self.buckets) if count
+            },
+        }
+
+
+@dataclass
+class TransportTelemetry:
+    """Counters for every command sent through a TelemetryTransport."""
+
+    # keyed by the command name, e.g. "ls2" or "temp"
+    latencies: dict[str, LatencyHistogram] = field(default_factory=dict)
+    timeouts: int = 0
+    connection_errors: int = 0
+    remote_errors: int = 0
+    bytes_out: int = 0
+    bytes_in: int = 0
+
+    @property
+    def commands(self) -> int:
+        return sum(histogram.count for histogram in self.latencies.values())
+
+    @property
+    def average_latency(self) -> float | None:
+        if not (commands := self.commands):
+            return None
+
+        return sum(histogram.total for histogram in self.latencies.values()) / commands
+
+    def record_command(self, command: str, duration: float, result: list[str] | BaseException) -> None:
+        name = command.split(maxsplit=1)[0] if command.strip() else ""
+
+        if (histogram := self.latencies.get(name)) is None:
+            histogram = self.latencies[name] = LatencyHistogram()
+
+        histogram.record(duration)
+
+        # the line feed terminating the command
+        self.bytes_out += len(command.encode("utf-8")) + 1
+
+        if isinstance(result, BaseException):
+            self.record_error(result)
+        else:
+            self.bytes_in += sum(len(line.encode("utf-8")) + 2 for line in result) + RESPONSE_OVERHEAD
+
+    def record_error(self, exc: BaseException) -> None:
+        if isinstance(exc, exceptions.CoolMasterNetRemoteError):
+            self.remote_errors += 1
+        elif _is_timeout(exc):
+            self.timeouts += 1
+        else:
+            self.connection_errors += 1
+
+    def as_dict(self) -> dict:
+        return {
+            "commands": self.commands,
+            "average_latency": self.average_latency,
+            "timeouts": self.timeouts,
+            "connection_errors": self.connection_errors,
+            "remote_errors": self.remote_errors,
+            "bytes_out": self.bytes_out,
+            "bytes_in": self.bytes_in,
+            "latencies": {name: histogram.as_dict() for name, histogram in sorted(self.latencies.items())},
+        }
+
+
+class WireTrace:
+    """
+    The last exchanges with the gateway, in a ring buffer of fixed size.
+
+    Recording an exchange only keeps a reference to its command and response, anything costlier
+    is left for when the trace is dumped.
+    """
+
+    def __init__(self, size: int = WIRE_TRACE_SIZE) -> None:
+        # (completion time as a UNIX timestamp, command, duration, response lines or exception)
+        self.exchanges: deque[tuple[float, str, float, list[str] | BaseException]] = deque(maxlen=size)
+
+    def record(self, command: str, duration: float, result: list[str] | BaseException) -> None:
+        self.exchanges.append((time.time(), command, duration, result))
+
+    def as_list(self) -> list[dict]:
+        return [
+            {
+                "started": datetime.fromtimestamp(completed - duration, timezone.utc).isoformat(),
+                "duration": duration,
+                "command": command,
+                **({"error": repr(result)} if isinstance(result, BaseException) else {"response": list(result)}),
+            }
+            for completed, command, duration, result in self.exchanges
+        ]
+
+
+def _is_timeout(exc: BaseException | None) -> bool:
+    while exc is not None:
+        if isinstance(exc, (asyncio.TimeoutError, TimeoutError)):
+            return True
+
+        exc = exc.__cause__
+
+    return False
+
+
+class TelemetryTransport(TransportWrapper):
+    """
+    Records the latency, outcome and size of every command sent through the wrapped transport,
+    and keeps the last few exchanges in a WireTrace.
+
+    Byte counts are estimated from the command and response text, as the wrapped transport's framing is not visible.
+    Commands sent as a pipelined batch share the duration of the whole batch in the latency histograms,
+    so a batch weighs the same as sending its commands one by one. The wire trace shows the whole batch's duration.
+    """
+
+    def __init__(self, transport: transports.BaseTransport):
+        super().__init__(transport)
+
+        self.telemetry = TransportTelemetry()
+        self.trace = WireTrace()
+
+    @property
+    def retries(self) -> int:
+        """Commands sent again by the wrapped transport, if it keeps count of them."""
+        if (stats := getattr(unwrap_transport(self.transport), "stats", None)) is None:
+            return 0
+
+        return stats.replayed_commands + stats.retried_commands
+
+    async def command(self, command: str) -> list[str]:
+        started = time.monotonic()
+
+        try:
+            result = await self.transport.command(command)
+        except (OSError, exceptions.CoolMasterNetRemoteError, asyncio.TimeoutError) as exc:
+            self._record(command, time.monotonic() - started, exc)
+            raise
+
+        self._record(command, time.monotonic() - started, result)
+
+        return result
+
+    async def command_many(self, commands: list[str]) -> list[list[str] | Exception]:
+        started = time.monotonic()
+
+        try:
+            results = await async_command_many(self.transport, commands)
+        except (OSError, asyncio.TimeoutError) as exc:
+            self._record_batch(commands, time.monotonic() - started, [exc] * len(commands))
+            raise
+
+        self._record_batch(commands, time.monotonic() - started, results)
+
+        return results
+
+    def _record(self, command: str, duration: float, result: list[str] | BaseException) -> None:
+        self.telemetry.record_command(command, duration, result)
+        self.trace.record(command, duration, result)
+
+    def _record_batch(
+        self, commands: list[str], duration: float, results: Sequence[list[str] | BaseException]
+    ) -> None:
+        share = duration / len(commands) if commands else 0.0
+
+        for command, result in zip(commands, results):
+            self.telemetry.record_command(command, share, result)
+            self.trace.record(command, duration, result)
+
+
+@dataclass
+class PollTelemetry:
+    """Duration of the coordinator's poll cycles, overall and per unit."""
+
+    polls: LatencyHistogram = field(default_factory=LatencyHistogram)
+    # delay between a poll's scheduled time and its start, see PollScheduler
+    lags: LatencyHistogram = field(default_factory=LatencyHistogram)
+    failed_polls: int = 0
+    # seconds spent on each unit during the last poll, keyed by UID
+    unit_durations: dict[str, float] = field(default_factory=dict)
+
+    @property
+    def slowest_unit(self) -> tuple[str, float] | None:
+        if not self.unit_durations:
+            return None
+
+        return max(self.unit_durations.items(), key=lambda item: item[1])
+
+    def as_dict(self) -> dict:
+        return {
+            "polls": self.polls.as_dict(),
+            "lags": self.lags.as_dict(),
+            "failed_polls": self.failed_polls,
+            "unit_durations": dict(self.unit_durations),
+        }
@@ -0,0 +1,37 @@
+"""
+Tests run the integration in a throwaway Home Assistant instance, the same way benchmarks/benchmark.py does.
+
+They need Home Assistant and the integration's requirements installed, run them from the repository root:
+
+    python -m pytest tests
+"""
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+sys.path.insert(0, str(REPO_ROOT))
+
+
+async def async_create_hass(config_dir: Path):
+    from homeassistant import config_entries, core
+    from homeassistant.helpers import device_registry, entity_registry
+
+    os.symlink(REPO_ROOT / "custom_components", config_dir / "custom_components")
+
+    hass = core.HomeAssistant()
+    hass.config.config_dir = str(config_dir)
+    hass.config.skip_pip = True
+    # the network integration depends on these, which need a full-blown instance - nothing here uses them
+    hass.config.components.update({"http", "websocket_api"})
+
+    await device_registry.async_load(hass)
+    await entity_registry.async_load(hass)
+
+    hass.config_entries = config_entries.ConfigEntries(hass, {})
+    await hass.config_entries.async_initialize()
+
+    return hass
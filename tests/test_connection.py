@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import asyncio
+
+
+def test_cancelled_exchange_does_not_shift_responses():
+    """A command cancelled while its response is on the way must not have it read as the next command's."""
+
+    async def async_test():
+        from custom_components.coolmaster_ng.connection import PersistentTCPTransport
+        from custom_components.coolmaster_ng.simulator import SimulatedGateway, SimulatorConditions, async_serve
+
+        gateway = SimulatedGateway(units=3)
+        server = await async_serve(gateway, port=0, conditions=SimulatorConditions(latency=0.2))
+        port = server.sockets[0].getsockname()[1]
+        transport = PersistentTCPTransport("127.0.0.1", port)
+
+        try:
+            await transport.command("set")
+
+            ls2 = asyncio.create_task(transport.command("ls2"))
+            await asyncio.sleep(0.05)
+            ls2.cancel()
+
+            try:
+                await ls2
+            except asyncio.CancelledError:
+                pass
+
+            settings = await transport.command("set")
+            assert any(line.startswith("S/N") for line in settings), settings
+
+            assert len(await transport.command("ls2")) == len(gateway.units)
+        finally:
+            await transport.async_close()
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(async_test())
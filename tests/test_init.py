@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import asyncio
+
+from conftest import async_create_hass
+
+DOMAIN = "coolmaster_ng"
+
+
+def test_setup_from_cache(tmp_path):
+    """Reloading an entry sets it up from the gateway cache, which has to bring up the same entities."""
+
+    async def async_test():
+        from homeassistant.config_entries import ConfigEntry, ConfigEntryState
+        from homeassistant.const import CONF_PROTOCOL, STATE_UNAVAILABLE
+
+        from custom_components.coolmaster_ng.const import CONF_SIMULATOR_UNITS, PROTOCOL_SIMULATOR
+
+        hass = await async_create_hass(tmp_path)
+
+        try:
+            entry = ConfigEntry(
+                version=2,
+                domain=DOMAIN,
+                title="Simulator",
+                data={CONF_PROTOCOL: PROTOCOL_SIMULATOR, CONF_SIMULATOR_UNITS: 3},
+                source="user",
+            )
+            await hass.config_entries.async_add(entry)
+            await hass.async_block_till_done()
+
+            entity_ids = {
+                domain: sorted(hass.states.async_entity_ids(domain))
+                for domain in ("climate", "binary_sensor", "button")
+            }
+            assert all(entity_ids.values())
+
+            # the first setup seeded the cache
+            assert await hass.config_entries.async_reload(entry.entry_id)
+            await hass.async_block_till_done()
+
+            assert entry.state is ConfigEntryState.LOADED
+
+            for domain, domain_entity_ids in entity_ids.items():
+                assert sorted(hass.states.async_entity_ids(domain)) == domain_entity_ids
+
+                for entity_id in domain_entity_ids:
+                    state = hass.states.get(entity_id)
+                    # placeholders of entities which failed to be set up are restored, not written by an entity
+                    assert not state.attributes.get("restored"), entity_id
+                    assert state.state != STATE_UNAVAILABLE, entity_id
+
+            await hass.config_entries.async_unload(entry.entry_id)
+        finally:
+            await hass.async_stop(force=True)
+
+    asyncio.run(async_test())
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import asyncio
+
+from conftest import async_create_hass
+
+DOMAIN = "coolmaster_ng"
+
+
+def test_runtime_accounts_for_max_poll_interval(tmp_path):
+    """Idle polls can be up to the configured max poll interval apart, the runtime has to keep accumulating."""
+
+    async def async_test():
+        from homeassistant.config_entries import ConfigEntry
+        from homeassistant.const import CONF_PROTOCOL
+
+        from custom_components.coolmaster_ng.const import (
+            CONF_MAX_SCAN_INTERVAL,
+            CONF_SIMULATOR_UNITS,
+            DATA_COORDINATOR,
+            PROTOCOL_SIMULATOR,
+            RUNTIME_MAX_GAP,
+        )
+
+        hass = await async_create_hass(tmp_path)
+        max_scan_interval = RUNTIME_MAX_GAP * 2
+
+        try:
+            entry = ConfigEntry(
+                version=2,
+                domain=DOMAIN,
+                title="Simulator",
+                data={CONF_PROTOCOL: PROTOCOL_SIMULATOR, CONF_SIMULATOR_UNITS: 1},
+                options={CONF_MAX_SCAN_INTERVAL: max_scan_interval},
+                source="user",
+            )
+            await hass.config_entries.async_add(entry)
+            await hass.async_block_till_done()
+
+            coordinator = hass.data[DOMAIN][entry.entry_id][DATA_COORDINATOR]
+            uid, device = next(iter(coordinator.gateway.devices.items()))
+
+            runtime = coordinator.runtime.units[str(uid)]
+            runtime.compressor = 0.0
+            runtime.compressor_running = True
+            runtime.updated -= max_scan_interval
+
+            coordinator.runtime.update({str(uid): device})
+            assert runtime.compressor >= max_scan_interval
+
+            await hass.config_entries.async_unload(entry.entry_id)
+        finally:
+            await hass.async_stop(force=True)
+
+    asyncio.run(async_test())
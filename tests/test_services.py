@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import asyncio
+
+from conftest import async_create_hass
+
+DOMAIN = "coolmaster_ng"
+
+
+def test_bulk_set_hvac_mode_without_target(tmp_path):
+    """Without a target, every unit of every gateway is controlled."""
+
+    async def async_test():
+        from homeassistant.config_entries import ConfigEntry
+        from homeassistant.const import CONF_PROTOCOL
+
+        from custom_components.coolmaster_ng.const import CONF_SIMULATOR_UNITS, PROTOCOL_SIMULATOR
+
+        hass = await async_create_hass(tmp_path)
+
+        try:
+            entry = ConfigEntry(
+                version=2,
+                domain=DOMAIN,
+                title="Simulator",
+                data={CONF_PROTOCOL: PROTOCOL_SIMULATOR, CONF_SIMULATOR_UNITS: 3},
+                source="user",
+            )
+            await hass.config_entries.async_add(entry)
+            await hass.async_block_till_done()
+
+            await hass.services.async_call(DOMAIN, "bulk_set_hvac_mode", {"hvac_mode": "dry"}, blocking=True)
+            await hass.async_block_till_done()
+
+            assert {hass.states.get(entity_id).state for entity_id in hass.states.async_entity_ids("climate")} == {
+                "dry"
+            }
+
+            await hass.config_entries.async_unload(entry.entry_id)
+        finally:
+            await hass.async_stop(force=True)
+
+    asyncio.run(async_test())